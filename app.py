@@ -4,6 +4,9 @@ import os
 import altair as alt
 import predict
 import backtest
+import store
+import strategy
+import manifest
 import io
 from contextlib import redirect_stdout
 from datetime import datetime, timedelta
@@ -12,7 +15,6 @@ from datetime import datetime, timedelta
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PRED_FILE = os.path.join(BASE_DIR, "daily_predictions.csv")
 PERF_FILE = os.path.join(BASE_DIR, "performance_log.csv")
-DATA_FILE = os.path.join(BASE_DIR, "cbb_training_data_processed.csv")
 
 st.set_page_config(page_title="CBB Quant Edge", page_icon="🏀", layout="centered")
 
@@ -64,7 +66,7 @@ with tab2:
         def get_metrics(df_subset):
             if len(df_subset) == 0: return 0, 0.0, 0.0
             df_subset = df_subset.copy()
-            df_subset['units'] = df_subset['pick_correct'].apply(lambda x: 1.0 if x else -1.1)
+            df_subset['units'] = strategy.units(df_subset['pick_correct'])
             cnt = len(df_subset)
             wins = df_subset['pick_correct'].sum()
             rate = wins / cnt
@@ -117,7 +119,7 @@ with tab2:
         st.divider()
 
         st.subheader("💰 30-Day Profit Trend")
-        hist['units'] = hist['pick_correct'].apply(lambda x: 1.0 if x else -1.1)
+        hist['units'] = strategy.units(hist['pick_correct'])
         hist['cumulative_units'] = hist['units'].cumsum()
         
         chart = alt.Chart(hist).mark_line(color='#4CAF50').encode(
@@ -147,7 +149,6 @@ with tab2:
                 f = io.StringIO()
                 try:
                     with redirect_stdout(f):
-                        backtest.DATA_FILE = DATA_FILE
                         backtest.OUTPUT_FILE = PERF_FILE
                         backtest.run_backtest()
                     output = f.getvalue()
@@ -160,6 +161,10 @@ with tab2:
 
 with st.expander("🛠 System Check"):
     st.write(f"**Current Directory:** `{os.getcwd()}`")
-    st.write(f"**Data File:** `{DATA_FILE}`")
-    if os.path.exists(DATA_FILE):
-        st.caption(f"Data Size: {os.path.getsize(DATA_FILE) / 1024:.1f} KB")
\ No newline at end of file
+    st.write(f"**Data Store:** `{store.DATA_DIR}`")
+    info = manifest.table_info(store.GAMES)
+    if info and info.get('last_date'):
+        st.caption(f"Data: {info['rows']} rows across {len(info['partitions'])} days, through {info['last_date']}")
+        stale = manifest.days_stale(store.GAMES)
+        if stale is not None and stale > 2:
+            st.warning(f"Data is {stale} days old. Run main.py to update!")
\ No newline at end of file
@@ -4,60 +4,41 @@ import xgboost as xgb
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import accuracy_score
+import store
+import feature_registry
 
-# --- CONFIG ---
-DATA_FILE = "cbb_training_data_processed.csv"
+# The Full Arsenal of Features
+MATCHUP_FEATURES = [
+    'is_home', 'spread', 'rest_days', 'roll5_cover_margin',
+    'off_advantage', 'def_advantage', 
+    'glass_advantage', 'diff_3PR', 'diff_volatility',
+    'momentum_gap'
+]
 
-def create_matchup_features(df):
+def create_matchup_features(df, names=MATCHUP_FEATURES, history=None):
     """
     LAYER 1: ADVANCED MATCHUP LOGIC
+    Definitions live in feature_registry; only what `names` needs is computed.
+    `history` is the unfiltered feature table opponent lookups search.
+    Raises MissingInputError if the data can't support a feature.
     """
-    # 1. SOS Adjusted Efficiency (The "KenPom" Logic)
-    # My Offense vs Your Defense (Not just Your General Quality)
-    # Note: 'opp_season_opp_eFG' = The eFG% the opponent ALLOWS (Defense).
-    df['off_advantage'] = df['season_team_eFG'] - df['opp_season_opp_eFG']
-    
-    # My Defense vs Your Offense
-    # 'opp_season_team_eFG' = The Opponent's Offense.
-    # 'season_opp_eFG' = My Allowed eFG% (Defense).
-    df['def_advantage'] = df['season_opp_eFG'] - df['opp_season_team_eFG']
-    
-    # 2. Style Matchups
-    # 3-Point Disparity: If I shoot a ton of 3s and you don't...
-    df['diff_3PR'] = df['season_team_3PR'] - df['opp_season_team_3PR']
-    
-    # Rebounding Mismatch
-    df['glass_advantage'] = df['season_team_ORB'] - df['opp_season_team_ORB']
-    
-    # 3. Volatility Gap (Chaos Factor)
-    df['diff_volatility'] = df['roll5_score_volatility'] - df['opp_roll5_score_volatility']
-    
-    # 4. Momentum
-    df['momentum_gap'] = df['roll3_team_eFG'] - df['season_team_eFG']
-    
-    return df
+    return feature_registry.compute(df, names, history)
 
 def audit_models():
     print("--- 🔬 RUNNING MATCHUP AUDIT 🔬 ---")
     
     try:
-        df = pd.read_csv(DATA_FILE).dropna()
-        df = df.sort_values('date')
+        full = store.load_processed()
+        df = full.dropna().sort_values('date')
     except:
         print("❌ Data not found."); return
 
-    df = create_matchup_features(df)
-    
-    # The Full Arsenal of Features
-    feature_cols = [
-        'is_home', 'spread', 'rest_days', 'roll5_cover_margin',
-        'off_advantage', 'def_advantage', 
-        'glass_advantage', 'diff_3PR', 'diff_volatility',
-        'momentum_gap'
-    ]
+    try:
+        df = create_matchup_features(df, history=full)
+    except feature_registry.MissingInputError as e:
+        print(f"❌ {e.args[0]}"); return
     
-    # Filter for what actually exists in data
-    final_feats = [c for c in feature_cols if c in df.columns]
+    final_feats = MATCHUP_FEATURES
     X = df[final_feats]
     y = df['ats_win']
     
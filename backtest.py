@@ -1,129 +1,303 @@
 import pandas as pd
 import numpy as np
+import sklearn
+import joblib
 from sklearn.ensemble import RandomForestClassifier
-from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import hashlib
+import json
 import os
+import shutil
+import tempfile
+import manifest
+import store
+import team_state
+import strategy
 
 # --- BULLETPROOF PATHS ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(BASE_DIR, "cbb_training_data_processed.csv")
 OUTPUT_FILE = os.path.join(BASE_DIR, "performance_log.csv")
+ARRAY_DIR = os.path.join(BASE_DIR, ".cache", "backtest")
+MODEL_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "backtest_models")
+KEEP_FOLD_MODELS = 200   # Least recently used fold models beyond this are deleted
 WEEKS_BACK = 4
+FOLD_DAYS = 7            # Retrain cadence: 7 = weekly folds, 1 = daily
+TRAIN_WINDOW_DAYS = None # None = expanding window (all history), N = sliding window of the last N days
+FOLD_ANCHOR_DAY = 4      # 1970-01-05, a Monday: cutoffs sit on a fixed grid so past folds stay put as new days arrive
+MIN_TRAIN_ROWS = 50
+CPU_BUDGET = os.cpu_count() or 1
 
-def train_model_at_date(df, cutoff_date):
-    # 1. Filter for PAST games only
-    # We create a copy to avoid SettingWithCopy warnings
-    past_games = df[df['date'] < cutoff_date].copy()
-    
-    features = [
-        'is_home', 
-        'spread', 
-        'rest_days', 
-        'diff_eFG', 
-        'diff_Rebound', 
-        'diff_TO', 
-        'momentum_gap', 
-        'roll5_cover_margin'
-    ]
-    
-    # Check 1: Do we have the columns?
-    valid_feats = [f for f in features if f in past_games.columns]
-    if not valid_feats:
-        return None, None
-
-    # Check 2: Drop NaNs only for the features we need
-    # This keeps us from dropping rows just because unrelated columns are empty
-    train_data = past_games.dropna(subset=valid_feats + ['ats_win'])
-    
-    # Check 3: Do we have enough data to actually learn?
-    # Random Forest needs at least a decent sample size.
-    if len(train_data) < 50:
-        return None, None
-    
-    X = train_data[valid_feats]
-    y = train_data['ats_win']
-    X.columns = X.columns.astype(str)
-    
-    # 3. Train Model
-    clf = RandomForestClassifier(n_estimators=500, max_depth=7, min_samples_leaf=4, random_state=42, n_jobs=-1)
+FEATURES = [
+    'is_home',
+    'spread',
+    'rest_days',
+    'diff_eFG',
+    'diff_Rebound',
+    'diff_TO',
+    'momentum_gap',
+    'roll5_cover_margin'
+]
+# Game keys saved with every out-of-sample row
+OOS_KEYS = ['date', 'day', 'team_id', 'opp_id', 'team', 'opponent', 'location']
+
+RF_PARAMS = dict(n_estimators=500, max_depth=7, min_samples_leaf=4, random_state=42)
+
+def build_arrays(df, feats):
+    """
+    Split the date-sorted frame once per run into two contiguous float32 blocks:
+    trainable rows (every feature + the label) and scorable rows (home side, every
+    feature). Both stay in date order, so any fold's history or test week is a
+    [lo:hi] slice of them, a view rather than a copy.
+    """
+    X = df[feats].to_numpy(dtype=np.float32)
+    y = df['ats_win'].to_numpy(dtype=np.float32)
+    days = df['day'].to_numpy(dtype=np.int32)
+    has_feats = ~np.isnan(X).any(axis=1)
+    train = np.flatnonzero(has_feats & ~np.isnan(y))
+    test = np.flatnonzero(has_feats & (df['is_home'].to_numpy() == 1))
+    return {
+        'X_train': np.ascontiguousarray(X[train]),
+        'y_train': y[train].astype(np.int8),
+        'train_day': days[train],
+        'X_test': np.ascontiguousarray(X[test]),
+        'test_row': test,
+        'test_day': days[test],
+    }
+
+def plan_folds(arrays, end_day, back_days, fold_days=FOLD_DAYS, window_days=TRAIN_WINDOW_DAYS):
+    """
+    Cutoffs every `fold_days` on the FOLD_ANCHOR_DAY grid covering the last `back_days`
+    before `end_day` (the newest fold may be partial). Each fold is
+    (cutoff_day, train_lo, train_hi, test_lo, test_hi): offsets into the train/test
+    blocks, found with a binary search per boundary.
+    """
+    start_day = end_day - back_days
+    first = start_day - (start_day - FOLD_ANCHOR_DAY) % fold_days
+    cutoffs = np.arange(first, end_day, fold_days)
+    train_day, test_day = arrays['train_day'], arrays['test_day']
+    train_hi = np.searchsorted(train_day, cutoffs, side='left')
+    if window_days is None:
+        train_lo = np.zeros_like(train_hi)
+    else:
+        train_lo = np.searchsorted(train_day, cutoffs - window_days, side='left')
+    test_lo = np.searchsorted(test_day, cutoffs, side='left')
+    test_hi = np.searchsorted(test_day, cutoffs + fold_days, side='left')
+    return [tuple(int(v) for v in fold) for fold in zip(cutoffs, train_lo, train_hi, test_lo, test_hi)]
+
+def share_arrays(arrays):
+    """Write arrays once as .npy files that every worker memory-maps (nothing is pickled)."""
+    os.makedirs(ARRAY_DIR, exist_ok=True)
+    run_dir = tempfile.mkdtemp(prefix="run-", dir=ARRAY_DIR)  # Fresh path per run: workers key their maps on it
+    paths = {}
+    for name, arr in arrays.items():
+        paths[name] = os.path.join(run_dir, f"{name}.npy")
+        np.save(paths[name], arr)
+    return run_dir, paths
+
+_ATTACHED = {}
+
+def _attach(paths):
+    """Memory-map the shared arrays (once per worker process)."""
+    key = tuple(sorted(paths.items()))
+    if key not in _ATTACHED:
+        _ATTACHED.clear()
+        _ATTACHED[key] = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+    return _ATTACHED[key]
+
+def fold_key(cutoff_day, feats, X, y):
+    """Cache key of a fold model: cutoff, feature list, hyperparameters and the exact training slice."""
+    spec = {'cutoff': int(cutoff_day), 'features': list(feats), 'params': RF_PARAMS, 'sklearn': sklearn.__version__}
+    h = hashlib.sha256(json.dumps(spec, sort_keys=True).encode())
+    h.update(np.ascontiguousarray(X))
+    h.update(np.ascontiguousarray(y))
+    return h.hexdigest()[:32]
+
+def model_cache_path(key):
+    return os.path.join(MODEL_CACHE_DIR, f"fold-{key}.joblib")
+
+def fit_cached(key, X, y, tree_jobs=1):
+    """The fold model for `key`: loaded from disk if this exact fold was trained before, else fitted and saved."""
+    path = model_cache_path(key)
+    if os.path.exists(path):
+        try:
+            clf = joblib.load(path)
+            os.utime(path)  # Mark as recently used for gc_model_cache
+            return clf, True
+        except Exception:
+            pass  # Unreadable artifact: retrain and overwrite it
+    clf = RandomForestClassifier(**RF_PARAMS, n_jobs=tree_jobs)
     clf.fit(X, y)
-    
-    return clf, valid_feats
+    store.atomic_write(path, lambda tmp: joblib.dump(clf, tmp))
+    return clf, False
 
-def run_backtest():
-    print(f"--- 📉 STARTING BACKTEST (Honest Mode) ---")
-    
-    if not os.path.exists(DATA_FILE):
-        print(f"❌ CRITICAL ERROR: Training data not found at {DATA_FILE}")
+def run_fold(paths, feats, cutoff_day, train_lo, train_hi, test_lo, test_hi, tree_jobs=1):
+    """
+    Train on the history slice [train_lo, train_hi) and score the test slice
+    [test_lo, test_hi). Returns a dict with the scored frame rows, prob_home, the
+    model cache key and whether the model was reused; None when there isn't
+    enough history to train.
+    """
+    # Random Forest needs at least a decent sample size.
+    if train_hi - train_lo < MIN_TRAIN_ROWS:
+        return None
+
+    a = _attach(paths)
+    X, y = a['X_train'][train_lo:train_hi], a['y_train'][train_lo:train_hi]
+    key = fold_key(cutoff_day, feats, X, y)
+    clf, cached = fit_cached(key, X, y, tree_jobs)
+
+    X_test = a['X_test'][test_lo:test_hi]
+    probs = clf.predict_proba(X_test)[:, 1] if len(X_test) else np.zeros(0)
+    return {'rows': np.asarray(a['test_row'][test_lo:test_hi]), 'probs': probs, 'key': key, 'cached': cached}
+
+def gc_model_cache(keep, max_entries=KEEP_FOLD_MODELS):
+    """
+    Drop the least recently used fold models beyond `max_entries` (never those in
+    `keep`), so runs with other cadences or windows keep their cache. In-flight
+    .tmp files belong to other processes and are left alone.
+    """
+    if not os.path.isdir(MODEL_CACHE_DIR):
         return
+    keep = {os.path.basename(model_cache_path(k)) for k in keep}
+    models = []
+    for name in os.listdir(MODEL_CACHE_DIR):
+        if name.endswith('.joblib') and name not in keep:
+            try:
+                models.append((os.path.getmtime(os.path.join(MODEL_CACHE_DIR, name)), name))
+            except OSError:
+                pass  # Removed by a concurrent run
+    for _, name in sorted(models, reverse=True)[max(0, max_entries - len(keep)):]:
+        try:
+            os.remove(os.path.join(MODEL_CACHE_DIR, name))
+        except OSError:
+            pass
+
+def split_cpu(n_folds, budget=CPU_BUDGET):
+    """Fold-level workers first (folds scale perfectly), leftover cores go to trees."""
+    fold_workers = max(1, min(n_folds, budget))
+    return fold_workers, max(1, budget // fold_workers)
+
+def run_folds(paths, feats, folds, budget=CPU_BUDGET):
+    """Run every fold (process pool when there's more than one core); results in fold order."""
+    fold_workers, tree_jobs = split_cpu(len(folds), budget)
+    print(f"   -> {len(folds)} folds on {fold_workers} worker(s) x {tree_jobs} tree job(s)")
+    args = [(paths, feats, *bounds, tree_jobs) for bounds in folds]
+    if fold_workers == 1:
+        return [run_fold(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=fold_workers) as pool:
+        futures = [pool.submit(run_fold, *a) for a in args]
+        return [f.result() for f in futures]
 
-    df = pd.read_csv(DATA_FILE)
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date')
+def run_backtest(df=None, budget=CPU_BUDGET, fold_days=FOLD_DAYS, window_days=TRAIN_WINDOW_DAYS):
+    """
+    Walk-forward backtest. `df` is the processed feature table (loaded if omitted).
+    Retrains every `fold_days` on the last `window_days` of history (all of it if None).
+    """
+    print(f"--- 📉 STARTING BACKTEST (Honest Mode) ---")
+
+    if df is None:
+        try:
+            df = store.load_processed()
+        except FileNotFoundError:
+            print(f"❌ CRITICAL ERROR: Training data not found in {store.DATA_DIR}")
+            return
+
+    # Total order (one game per team per day), so a fold's training slice doesn't depend on later rows
+    df = df.sort_values(['day', 'team_id'], kind='stable').reset_index(drop=True)
 
-    # --- CALCULATE REST DAYS (Dynamic) ---
-    df['last_game'] = df.groupby('team')['date'].shift(1)
-    df['rest_days'] = (df['date'] - df['last_game']).dt.days.fillna(7)
-    df['rest_days'] = df['rest_days'].clip(upper=7) 
+    # --- MODEL INPUTS FROM THE AS-OF TEAM STORE (same path predict.py serves from) ---
+    ts = team_state.TeamStateStore.from_features(df)
+    own = ts.asof_bulk(df['team_id'], df['day'])
+    opp = ts.asof_bulk(df['opp_id'], df['day'])
+    for col, values in team_state.matchup_features(own, opp).items():
+        df[col] = values.to_numpy(dtype='float32')
+    df['rest_days'] = team_state.rest_days(df['day'], own['last_game_day']).to_numpy(dtype='float32')
+
+    feats = [f for f in FEATURES if f in df.columns]
+    if not feats:
+        print("❌ CRITICAL ERROR: None of the model features are in the data.")
+        return
 
     # End Date: Max date in file + 1 day to cover everything
     end_date = df['date'].max() + timedelta(days=1)
     start_date = end_date - timedelta(weeks=WEEKS_BACK)
-    
-    print(f"   -> Testing Range: {start_date.date()} to {end_date.date()}")
-    
-    current_date = start_date
-    logs = []
-    
-    while current_date < end_date:
-        next_week = current_date + timedelta(days=7)
-        
-        # Train on EVERYTHING before current_date
-        model, feats = train_model_at_date(df, current_date)
-        
-        # SAFETY: If not enough data, skip this week
-        if model is None:
-            print(f"      ⚠️  Not enough history to train for week of {current_date.date()}. Skipping.")
-            current_date = next_week
+
+    arrays = build_arrays(df, feats)
+    end_day = int(store.day_numbers([end_date])[0])
+    folds = plan_folds(arrays, end_day, WEEKS_BACK * 7, fold_days, window_days)
+    cutoffs = pd.to_datetime([f[0] for f in folds], unit='D')
+
+    # The first cutoff sits on the fold grid, up to fold_days - 1 before start_date
+    first_test = cutoffs[0] if len(cutoffs) else start_date
+    print(f"   -> Testing Range: {first_test.date()} to {end_date.date()}")
+
+    run_dir, paths = share_arrays(arrays)
+    del arrays
+    try:
+        results = run_folds(paths, feats, folds, budget)
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    trained = [r for r in results if r is not None]
+    print(f"   -> Reused {sum(r['cached'] for r in trained)} of {len(trained)} fold models from cache")
+    gc_model_cache(r['key'] for r in trained)
+
+    frames = []
+    for fold_id, (cutoff, result) in enumerate(zip(cutoffs, results)):
+        # SAFETY: If not enough data, skip this fold
+        if result is None:
+            print(f"      ⚠️  Not enough history to train for fold of {cutoff.date()}. Skipping.")
             continue
-        
-        # Test on THIS WEEK (current_date to next_week)
-        mask = (df['date'] >= current_date) & (df['date'] < next_week) & (df['is_home'] == 1)
-        week_df = df[mask].copy()
-        
-        if len(week_df) > 0:
-            # Drop rows in test set if they miss features (can't predict on partial data)
-            week_df = week_df.dropna(subset=feats)
-            
-            if len(week_df) > 0:
-                X_test = week_df[feats]
-                X_test.columns = X_test.columns.astype(str)
-                
-                probs = model.predict_proba(X_test)[:, 1]
-                
-                week_df['prob_home'] = probs
-                week_df['conf'] = week_df['prob_home'].apply(lambda x: max(x, 1-x))
-                
-                # Logic: If prob_home > 0.5, Pick Home. Else Pick Away.
-                conditions = [week_df['prob_home'] > 0.5, week_df['prob_home'] <= 0.5]
-                week_df['picked_team'] = np.select(conditions, [week_df['team'], week_df['opponent']])
-                week_df['picked_spread'] = np.select(conditions, [week_df['spread'], -1 * week_df['spread']])
-                
-                # Grade: Did the pick win?
-                week_df['pick_correct'] = np.where(week_df['prob_home'] > 0.5, week_df['ats_win'] == 1, week_df['ats_win'] == 0)
-                
-                logs.append(week_df[['date', 'picked_team', 'picked_spread', 'conf', 'pick_correct']])
-        
-        current_date = next_week
-
-    if logs:
-        full_log = pd.concat(logs)
-        # Filter for "Actionable" bets (e.g. > 53% Confidence)
-        action_log = full_log[full_log['conf'] >= 0.53].copy()
-        action_log.to_csv(OUTPUT_FILE, index=False)
-        print(f"✅ SUCCESS: Saved {len(action_log)} bets to {OUTPUT_FILE}")
-    else:
+        fold_df = df.iloc[result['rows']][OOS_KEYS + feats + ['ats_win']].copy()
+        fold_df.insert(0, 'fold_id', np.int16(fold_id))
+        fold_df.insert(1, 'cutoff_day', np.int32(folds[fold_id][0]))
+        fold_df['prob_home'] = result['probs']
+        frames.append(fold_df)
+
+    if not frames or not sum(len(f) for f in frames):
         print("⚠️ WARNING: Backtest ran but generated no bets.")
+        return
+
+    oos = pd.concat(frames, ignore_index=True)
+    config = {
+        'features': feats,
+        'rf_params': RF_PARAMS,
+        'weeks_back': WEEKS_BACK,
+        'fold_days': fold_days,
+        'window_days': window_days,
+        'min_train_rows': MIN_TRAIN_ROWS,
+        'features_hash': manifest.content_hash(store.FEATURES),
+    }
+    run_id = save_run(oos, config)
+    print(f"   -> Stored {len(oos)} out-of-sample predictions as run {run_id}")
+
+    action_log = performance_log(oos)
+    action_log.to_csv(OUTPUT_FILE, index=False)
+    print(f"✅ SUCCESS: Saved {len(action_log)} bets to {OUTPUT_FILE}")
+    return action_log
+
+def save_run(oos, config):
+    """
+    Store a run's out-of-sample rows. The ID is a microsecond timestamp (so IDs sort
+    in run order), a hash of the config and the process ID, so two runs started
+    together never share a partition.
+    """
+    spec = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:8]
+    now = datetime.now()
+    run_id = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{spec}-{os.getpid()}"
+    config = dict(config, created_at=now.isoformat(timespec='seconds'))
+    return store.write_backtest_run(run_id, oos, config)
+
+def performance_log(oos):
+    """Picks + grades from out-of-sample rows, filtered to the actionable ones."""
+    # Logic: If prob_home > 0.5, Pick Home. Else Pick Away.
+    week_df = pd.concat([oos[['date']], strategy.picks(oos)], axis=1)
+    week_df['picked_team'] = np.where(week_df['picked_home'], oos['team'], oos['opponent'])
+
+    # Filter for "Actionable" bets (e.g. > 53% Confidence)
+    full_log = week_df[['date', 'picked_team', 'picked_spread', 'conf', 'pick_correct']]
+    return full_log[full_log['conf'] >= strategy.CONFIDENCE_THRESHOLD].copy()
 
 if __name__ == "__main__":
-    run_backtest()
\ No newline at end of file
+    run_backtest()
@@ -0,0 +1,66 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+import features
+import store
+
+# --- CONFIG ---
+SCALES = [1, 10, 100]
+
+def legacy_rolling_stats(df):
+    """The pandas groupby().expanding()/rolling()/shift() version the kernel replaced."""
+    df = df.sort_values(['team', 'date']).reset_index(drop=True)
+
+    for col in features.STATS_COLS:
+        df[f'season_team_{col}'] = df.groupby('team')[col].expanding().mean().reset_index(level=0, drop=True)
+        df[f'roll3_team_{col}'] = df.groupby('team')[col].rolling(3, min_periods=1).mean().reset_index(level=0, drop=True)
+
+    for col in features.STATS_COLS:
+        df[f'prev_season_{col}'] = df.groupby('team')[f'season_team_{col}'].shift(1)
+        df[f'prev_roll3_{col}'] = df.groupby('team')[f'roll3_team_{col}'].shift(1)
+
+    df['cover_margin'] = df['team_score'] + df['spread'] - df['opp_score']
+    df['roll5_cover_margin'] = df.groupby('team')['cover_margin'].rolling(5, min_periods=1).mean().reset_index(level=0, drop=True)
+    df['roll5_cover_margin'] = df.groupby('team')['roll5_cover_margin'].shift(1)
+    return df
+
+def scale_up(df, factor):
+    """factor copies of the games, each under its own set of team names (and IDs)."""
+    span = int(max(df['team_id'].max(), df['opp_id'].max())) + 1
+    copies = []
+    for i in range(factor):
+        part = df.copy()
+        if i:
+            part['team'] = part['team'] + f" #{i}"
+            part['opponent'] = part['opponent'] + f" #{i}"
+            part['team_id'] += i * span
+            part['opp_id'] += i * span
+        copies.append(part)
+    return pd.concat(copies, ignore_index=True)
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - t0
+
+def main(scales=SCALES):
+    print("--- ⏱️ ROLLING FEATURE BENCHMARK ---")
+    base = features.calculate_advanced_stats(store.add_keys(features.clean_stale_data(store.load_games())))
+    for c in ['team_score', 'opp_score', 'spread']:
+        base[c] = pd.to_numeric(base[c], errors='coerce')
+
+    print(f"{'scale':>6} {'rows':>10} {'pandas':>10} {'numpy':>10} {'speedup':>8}  max abs diff")
+    for factor in scales:
+        df = scale_up(base, factor)
+        old, t_old = timed(legacy_rolling_stats, df)
+        (new, _), t_new = timed(features.calculate_rolling_stats, df)
+        new = new.sort_values(['team', 'date']).reset_index(drop=True)
+
+        cols = [c for c in old.columns if c.startswith(('season_team_', 'roll3_team_', 'prev_', 'roll5_'))]
+        diff = np.nanmax(np.abs(old[cols].to_numpy(dtype=float) - new[cols].to_numpy(dtype=float)))
+        print(f"{factor:>5}x {len(df):>10} {t_old:>9.2f}s {t_new:>9.2f}s {t_old / t_new:>7.1f}x  {diff:.2e}")
+
+if __name__ == "__main__":
+    scales = [int(a) for a in sys.argv[1:]] or SCALES
+    main(scales)
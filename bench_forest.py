@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import joblib
+import numpy as np
+import store
+import compiled_forest
+
+# --- CONFIG ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_FILE = os.path.join(BASE_DIR, "cbb_model_v1.pkl")
+REPEATS = 5
+SLATE_ROWS = 60  # A busy day of games
+
+def best_of(fn, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+def load_cost(fn):
+    """(best seconds, peak Python-allocated MB) of one load."""
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best_of(fn), peak / 1e6
+
+def main():
+    print("--- 🌲 COMPILED FOREST BENCHMARK ---")
+    model = joblib.load(MODEL_FILE)
+    compiled = compiled_forest.CompiledForest.from_sklearn(model)
+    feats = list(model.feature_names_in_)
+    print(f"   Model: {compiled.n_estimators} trees, depth {compiled.depth}, {len(compiled.feature)} nodes")
+
+    df = store.load_processed()
+    full = df[feats].dropna().astype(float)
+    rng = np.random.default_rng(0)
+
+    path = tempfile.mkdtemp(prefix="bench_forest_")
+    try:
+        compiled.save(path)
+        for label, fn in [("joblib pickle", lambda: joblib.load(MODEL_FILE)),
+                          ("mmap artifact", lambda: compiled_forest.CompiledForest.load(path))]:
+            secs, peak = load_cost(fn)
+            print(f"   Load ({label}): {secs * 1e3:.2f}ms, peak {peak:.2f} MB allocated")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+    print(f"   {'batch':>8} {'sklearn':>12} {'compiled':>12} {'speedup':>8} {'max |diff|':>11}")
+    for rows in [1, SLATE_ROWS, len(full)]:
+        X = full.iloc[np.sort(rng.choice(len(full), rows, replace=False))]
+        ref = model.predict_proba(X)
+        got = compiled.predict_proba(X)
+        t_old = best_of(lambda: model.predict_proba(X))
+        t_new = best_of(lambda: compiled.predict_proba(X))
+        diff = np.abs(ref - got).max()
+        print(f"   {rows:>8} {t_old * 1e3:>10.2f}ms {t_new * 1e3:>10.2f}ms {t_old / t_new:>7.1f}x {diff:>11.1e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+import time
+import pandas as pd
+import store
+
+# --- CONFIG ---
+REPEATS = 5
+TEAM_LOOKUPS = 200
+
+def mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+def best_of(fn, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+def legacy_frame(df):
+    """What every module used to get: a CSV round trip with default dtypes."""
+    path = f"/tmp/bench_store_{id(df)}.csv"
+    df.to_csv(path, index=False)
+    try:
+        return pd.read_csv(path, low_memory=False)
+    finally:
+        os.remove(path)
+
+def main():
+    print("--- 📦 COMPACT REPRESENTATION BENCHMARK ---")
+    raw = store.read_table(store.FEATURES)
+    old = legacy_frame(raw)
+    new = store.compact(raw)
+
+    print(f"   Rows: {len(new)}  Columns: {len(new.columns)}")
+    print(f"   Memory: {mb(old):.1f} MB (CSV dtypes) -> {mb(new):.1f} MB (compact), {mb(old) / mb(new):.1f}x smaller")
+
+    teams = new['team'].cat.categories[:TEAM_LOOKUPS]
+    ids = store.team_ids(teams)
+    stat = 'season_team_eFG'
+    cases = [
+        ("groupby team mean",
+         lambda: old.groupby('team')[stat].mean(),
+         lambda: new.groupby('team_id')[stat].mean()),
+        ("merge on (date, opponent)",
+         lambda: old.merge(old[['date', 'team', stat]], left_on=['date', 'opponent'], right_on=['date', 'team'], how='left'),
+         lambda: new.merge(new[['day', 'team_id', stat]], left_on=['day', 'opp_id'], right_on=['day', 'team_id'], how='left')),
+        (f"{TEAM_LOOKUPS} team masks",
+         lambda: [old[old['team'] == t] for t in teams],
+         lambda: [new[new['team_id'] == i] for i in ids]),
+        ("sort by (team, date)",
+         lambda: old.sort_values(['team', 'date']),
+         lambda: new.sort_values(['team_id', 'day'])),
+    ]
+    print(f"\n   {'operation':<28} {'strings':>9} {'int keys':>9} {'speedup':>8}")
+    for name, slow, fast in cases:
+        t_old, t_new = best_of(slow), best_of(fast)
+        print(f"   {name:<28} {t_old:>8.3f}s {t_new:>8.3f}s {t_old / t_new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,35 @@
-import pandas as pd
-import os
-
-# --- CONFIG ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(BASE_DIR, "cbb_training_data_processed.csv")
+import store
+import manifest
 
 def main():
     print("--- 🕵️ DATA DIAGNOSTIC ---")
-    
-    if not os.path.exists(DATA_FILE):
+
+    store.migrate_legacy_csv()
+    info = manifest.table_info(store.GAMES)
+    if not info or not info.get('last_date'):
         print("❌ No data file found.")
         return
 
-    df = pd.read_csv(DATA_FILE)
-    print(f"📊 Total Rows: {len(df)}")
-    
-    # 1. Check Date Type
-    print(f"   -> Date Column Type: {df['date'].dtype}")
-    
-    # 2. Show the Last 10 Dates (Raw)
-    print("\n   -> Last 10 Dates in File (Raw):")
-    print(df['date'].tail(10).to_string(index=False))
-    
-    # 3. Check for Jan 7 specifically
-    # We look for partial matches to see if it's there but weird
-    mask = df['date'].astype(str).str.contains("2026-01-07")
-    jan7 = df[mask]
-    
-    print(f"\n   -> Rows containing '2026-01-07': {len(jan7)}")
-    
-    if len(jan7) > 0:
+    # Everything below comes from the manifest; only the Jan 7 sample touches data
+    counts = manifest.rows_per_date(store.GAMES)
+    print(f"📊 Total Rows: {info['rows']}")
+    print(f"   -> Data current through: {info['last_date']} ({manifest.days_stale(store.GAMES)} days ago)")
+
+    # 1. Show the Last 10 Dates
+    print("\n   -> Last 10 Dates in Store (rows per date):")
+    for day in sorted(counts)[-10:]:
+        print(f"      {day}: {counts[day]}")
+
+    # 2. Check for Jan 7 specifically
+    jan7_rows = counts.get("2026-01-07", 0)
+    print(f"\n   -> Rows for '2026-01-07': {jan7_rows}")
+
+    if jan7_rows > 0:
+        jan7 = store.read_partition(store.GAMES, "2026-01-07")
         print("   -> Sample Jan 7 Row:")
         print(jan7.iloc[0][['date', 'team', 'opponent']])
     else:
         print("   -> ⚠️ ZERO rows found for Jan 7. The day is missing.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -9,9 +9,10 @@ Run this after updating to the confidence-filtered grading system.
 import pandas as pd
 import os
 from datetime import datetime
+import strategy
 
 PERF_FILE = "performance_log.csv"
-CONFIDENCE_THRESHOLD = 0.53
+CONFIDENCE_THRESHOLD = strategy.CONFIDENCE_THRESHOLD
 
 print("="*60)
 print("CLEANING PERFORMANCE LOG")
@@ -52,7 +53,7 @@ if removed_count > 0:
     if len(df_filtered) > 0:
         wins = df_filtered['pick_correct'].sum()
         win_rate = wins / len(df_filtered)
-        units = df_filtered.apply(lambda x: 1.0 if x['pick_correct'] else -1.1, axis=1).sum()
+        units = strategy.units(df_filtered['pick_correct']).sum()
         
         print(f"\n📊 Updated Performance (Actionable Bets Only):")
         print(f"   Record: {int(wins)}-{len(df_filtered)-int(wins)}")
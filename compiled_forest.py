@@ -0,0 +1,144 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# --- CONFIG ---
+BATCH_ROWS = 256  # Rows traversed together; keeps the rows x trees node matrix cache-sized
+ARRAYS = ['feature', 'threshold', 'children', 'missing_right', 'leaf_proba', 'roots', 'classes_']
+HEADER_FILE = "header.json"
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous arrays: every tree's
+    nodes are concatenated, children point into the shared arrays and leaves point
+    at themselves. Scoring walks all trees for a whole batch in lockstep, one
+    vectorized step per level, instead of sklearn's per-call validation and
+    per-tree dispatch.
+
+    Inputs are cast to float32 like sklearn does, and each float64 threshold is
+    rounded down to the nearest float32, which keeps `x <= threshold` exact for
+    float32 x. The same leaves are reached, so probabilities match predict_proba
+    up to summation order.
+    """
+
+    def __init__(self, feature, threshold, children, missing_right, leaf_proba, roots, depth, classes, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children  # [left, right] per node, interleaved
+        self.missing_right = missing_right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes_ = classes
+        if feature_names is not None:
+            self.feature_names_in_ = feature_names
+
+    @classmethod
+    def from_sklearn(cls, clf):
+        if not hasattr(clf, 'estimators_') or not hasattr(clf, 'predict_proba'):
+            raise TypeError(f"Can't compile {type(clf).__name__}: expected a fitted forest classifier")
+        feature, threshold, children, missing_right, proba, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for est in clf.estimators_:
+            t = est.tree_
+            leaf = t.children_left < 0
+            ids = np.arange(t.node_count)
+            feature.append(np.where(leaf, 0, t.feature))
+            threshold.append(np.where(leaf, np.inf, t.threshold))
+            children.append(offset + np.column_stack([np.where(leaf, ids, t.children_left), np.where(leaf, ids, t.children_right)]))
+            # NaN fails `x <= threshold`, so it goes right unless the tree learned otherwise
+            go_left = getattr(t, 'missing_go_to_left', np.zeros(t.node_count, dtype=np.uint8))
+            missing_right.append(~leaf & (np.asarray(go_left) == 0))
+            value = t.value[:, 0, :]
+            proba.append(value / value.sum(axis=1, keepdims=True))
+            roots.append(offset)
+            offset += t.node_count
+            depth = max(depth, t.max_depth)
+
+        threshold = np.concatenate(threshold)
+        t32 = threshold.astype(np.float32)
+        t32 = np.where(t32 > threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=t32,
+            children=np.concatenate(children).astype(np.int32).ravel(),
+            missing_right=np.concatenate(missing_right),
+            leaf_proba=np.ascontiguousarray(np.concatenate(proba)),
+            roots=np.asarray(roots, dtype=np.int32),
+            depth=depth,
+            classes=np.asarray(clf.classes_),
+            feature_names=getattr(clf, 'feature_names_in_', None),
+        )
+
+    def save(self, path, **header):
+        """
+        Write to directory `path`: one .npy per array (loadable with mmap) plus a
+        JSON header with the shape info, feature names and any extra `header` fields.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        header = dict(header, depth=self.depth, n_estimators=self.n_estimators, n_nodes=len(self.feature))
+        if hasattr(self, 'feature_names_in_'):
+            header['features'] = [str(f) for f in self.feature_names_in_]
+        with open(os.path.join(path, HEADER_FILE), 'w') as f:
+            json.dump(header, f, indent=1, sort_keys=True)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open a saved forest; with mmap the arrays are paged in from disk on first use, not read up front."""
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+        arrays = {
+            name: np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None))
+            for name in ARRAYS
+        }
+        features = header.get('features')
+        return cls(
+            feature=arrays['feature'], threshold=arrays['threshold'], children=arrays['children'],
+            missing_right=arrays['missing_right'], leaf_proba=arrays['leaf_proba'], roots=arrays['roots'],
+            depth=header['depth'], classes=arrays['classes_'],
+            feature_names=np.array(features, dtype=object) if features is not None else None,
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def _matrix(self, X):
+        if isinstance(X, pd.DataFrame) and hasattr(self, 'feature_names_in_'):
+            X = X[list(self.feature_names_in_)]
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def _leaves(self, X):
+        """Leaf node of every (row, tree): [rows x trees] int32."""
+        flat = X.ravel()
+        base = (np.arange(len(X), dtype=np.int32) * np.int32(X.shape[1]))[:, None]
+        has_nan = np.isnan(flat).any()
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.depth):
+            x = flat[base + self.feature[node]]
+            go_right = x > self.threshold[node]
+            if has_nan:
+                go_right |= np.isnan(x) & self.missing_right[node]
+            node = self.children[2 * node + go_right]
+        return node
+
+    def predict_proba(self, X):
+        X = self._matrix(X)
+        out = np.empty((len(X), len(self.classes_)))
+        for a in range(0, len(X), BATCH_ROWS):
+            leaves = self._leaves(X[a:a + BATCH_ROWS])
+            out[a:a + BATCH_ROWS] = self.leaf_proba[leaves].sum(axis=1) / self.n_estimators
+        return out
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def compile_model(model):
+    """The compiled form of a forest classifier; anything else is returned unchanged."""
+    try:
+        return CompiledForest.from_sklearn(model)
+    except TypeError:
+        return model
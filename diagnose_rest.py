@@ -1,6 +1,8 @@
 import pandas as pd
 from datetime import datetime, timedelta
 import pytz
+import store
+import manifest
 
 print("="*60)
 print("REST DAYS DIAGNOSTIC")
@@ -9,15 +11,17 @@ print("="*60)
 # 1. Check historical data
 print("\n1. CHECKING HISTORICAL DATA:")
 try:
-    df = pd.read_csv('cbb_training_data_processed.csv')
+    df = store.load_processed()
     df['date'] = pd.to_datetime(df['date'])
     
-    last_date = df['date'].max()
+    last_date = manifest.last_date(store.FEATURES) or df['date'].max()
     print(f"   Data current through: {last_date.strftime('%Y-%m-%d')}")
     
     eastern = pytz.timezone('US/Eastern')
     today = datetime.now(eastern).date()
-    days_behind = (today - last_date.date()).days
+    days_behind = manifest.days_stale(store.FEATURES, today)
+    if days_behind is None:
+        days_behind = (today - last_date.date()).days
     
     if days_behind > 1:
         print(f"   ⚠️  WARNING: Data is {days_behind} days behind!")
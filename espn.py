@@ -0,0 +1,192 @@
+import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+import payload_cache
+
+# --- CONFIG ---
+SCOREBOARD_URL = "http://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/scoreboard"
+DEFAULT_PARAMS = {'limit': 1000, 'groups': 50}
+
+MAX_WORKERS = 8            # Concurrent requests in flight
+REQUESTS_PER_SECOND = 8.0  # Global cap across all workers
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5      # 0.5s, 1s, 2s, 4s...
+TIMEOUT = 10
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class RateLimiter:
+    """Hands out evenly spaced request slots to any number of threads."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+_session = None
+_session_lock = threading.Lock()
+_limiter = RateLimiter(REQUESTS_PER_SECOND)
+
+def get_session():
+    """One keep-alive session (pooled connections) shared by every caller."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def set_rate_limit(per_second):
+    """Change the global request rate (None or 0 disables the limit)."""
+    global _limiter
+    _limiter = RateLimiter(per_second)
+
+def fetch_scoreboard(target_date, params=None, use_cache=True):
+    """
+    Download the scoreboard JSON for one date.
+    Served from the local payload cache when possible (finished slates never expire).
+    Retries connection errors and 429/5xx responses with exponential backoff;
+    other HTTP errors fail immediately. Returns the parsed payload, or None.
+    """
+    params = dict(DEFAULT_PARAMS if params is None else params)
+    if use_cache:
+        cached = payload_cache.get(target_date, params)
+        if cached is not None:
+            return cached
+
+    query = dict(params)
+    query['dates'] = target_date.strftime("%Y%m%d")
+    session = get_session()
+
+    for attempt in range(MAX_RETRIES + 1):
+        delay = BACKOFF_SECONDS * (2 ** attempt)
+        try:
+            _limiter.wait()
+            res = session.get(SCOREBOARD_URL, params=query, timeout=TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        except requests.RequestException as e:
+            # Anything else (e.g. a broken chunked body) skips this date rather than aborting the batch
+            print(f"      ⚠️  Giving up on {query['dates']}: {e}")
+            return None
+        else:
+            if res.status_code in RETRY_STATUS:
+                error = f"HTTP {res.status_code}"
+                retry_after = res.headers.get('Retry-After', '')
+                if retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+            else:
+                # Anything else (404 and other 4xx, undecodable bodies) won't get better on retry
+                try:
+                    res.raise_for_status()
+                    payload = res.json()
+                except (requests.RequestException, ValueError) as e:
+                    print(f"      ⚠️  Giving up on {query['dates']}: {e}")
+                    return None
+                if use_cache:
+                    payload_cache.put(target_date, params, payload)
+                return payload
+
+        if attempt == MAX_RETRIES:
+            print(f"      ⚠️  Giving up on {query['dates']}: {error}")
+            return None
+        time.sleep(delay)
+
+def fetch_scoreboards(dates, params=None, max_workers=MAX_WORKERS, use_cache=True):
+    """
+    Fetch many dates concurrently (bounded by max_workers and the rate limit).
+    Returns a list of (date, payload) in the same order as `dates`.
+    """
+    dates = list(dates)
+    if not dates:
+        return []
+    workers = max(1, min(max_workers, len(dates)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        payloads = pool.map(lambda d: fetch_scoreboard(d, params, use_cache), dates)
+        return list(zip(dates, payloads))
+
+def iter_scoreboards(dates, params=None, max_workers=MAX_WORKERS, use_cache=True):
+    """
+    Like fetch_scoreboards, but yields (date, payload) as each request finishes,
+    so callers can stream results to disk. Pending requests are cancelled if
+    the caller stops early.
+    """
+    dates = list(dates)
+    if not dates:
+        return
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(dates))))
+    try:
+        futures = {pool.submit(fetch_scoreboard, d, params, use_cache): d for d in dates}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def parse_spread(comp, home_team):
+    """Home-perspective spread from ESPN's odds string (e.g. 'DUKE -5.5')."""
+    try:
+        if comp.get('odds'):
+            details = comp['odds'][0].get('details', '0')
+            if details and details != '0' and details != 'EVEN':
+                parts = details.split()
+                val = abs(float(parts[-1]))
+                fav = " ".join(parts[:-1])
+                home_abbr = home_team.get('abbreviation', '')
+                home_name = home_team.get('displayName', '')
+                is_home_fav = (fav == home_abbr) or (fav == home_name) or (fav in home_name)
+                return -val if is_home_fav else val
+    except: pass
+    return 0.0
+
+def parse_completed_games(payload, target_date):
+    """Turn a scoreboard payload into two rows (home + away) per completed game."""
+    games = []
+    game_date_str = target_date.strftime("%Y-%m-%d")
+
+    for event in (payload or {}).get('events', []):
+        if event['status']['type']['state'] != 'post': continue
+
+        try:
+            comp = event['competitions'][0]
+            home = comp['competitors'][0]
+            away = comp['competitors'][1]
+            spread_val = parse_spread(comp, home['team'])
+
+            games.append({
+                'date': game_date_str,
+                'team': home['team']['displayName'],
+                'opponent': away['team']['displayName'],
+                'location': 'Home',
+                'team_score': int(home['score']),
+                'opp_score': int(away['score']),
+                'is_home': 1,
+                'spread': spread_val,
+                'ats_win': 0
+            })
+            games.append({
+                'date': game_date_str,
+                'team': away['team']['displayName'],
+                'opponent': home['team']['displayName'],
+                'location': 'Away',
+                'team_score': int(away['score']),
+                'opp_score': int(home['score']),
+                'is_home': 0,
+                'spread': -1 * spread_val,
+                'ats_win': 0
+            })
+        except: continue
+
+    return games
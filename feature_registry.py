@@ -0,0 +1,131 @@
+import team_state
+
+class MissingInputError(KeyError):
+    """A requested feature needs a column that nothing in the data or registry provides."""
+
+class Feature:
+    """
+    A derived column: the columns it reads and the kernel that builds it from them.
+    `history` columns are read from the full feature table rather than the rows
+    being computed (as-of lookups must see every game, not a filtered subset).
+    """
+
+    def __init__(self, name, inputs, kernel, history=()):
+        self.name = name
+        self.inputs = inputs
+        self.kernel = kernel
+        self.history = list(history)
+
+REGISTRY = {}
+
+def feature(name, inputs, history=()):
+    """Register `kernel(*input_columns, *history_columns) -> column` under `name`."""
+    def wrap(kernel):
+        REGISTRY[name] = Feature(name, list(inputs), kernel, history)
+        return kernel
+    return wrap
+
+def opponent_feature(col, name=None):
+    """opp_<col> (or `name`): the opponent's `col` after its last game before this date (as-of lookup)."""
+    @feature(name or f'opp_{col}', ['opp_id', 'day'], history=['team_id', 'day', col])
+    def kernel(opp_id, day, hist_team_id, hist_day, values):
+        ts = team_state.TeamStateStore(hist_team_id.to_numpy(), hist_day.to_numpy(), values.to_numpy(dtype=float)[:, None], columns=[col])
+        return ts.asof_bulk(opp_id.to_numpy(), day.to_numpy())[col].to_numpy()
+    return kernel
+
+def plan(names, columns):
+    """
+    Features to compute, in dependency order, for `names` given the columns
+    already present. Present columns are reused, never recomputed.
+    Raises MissingInputError listing every base column that is unavailable.
+    """
+    order, missing = [], []
+    def visit(name, stack):
+        if name in columns or name in order:
+            return
+        if name in stack:
+            raise ValueError(f"Feature cycle: {' -> '.join(stack + [name])}")
+        if name not in REGISTRY:
+            missing.append(name)
+            return
+        for dep in REGISTRY[name].inputs + REGISTRY[name].history:
+            visit(dep, stack + [name])
+        order.append(name)
+    for name in names:
+        visit(name, [])
+    if missing:
+        raise MissingInputError(f"Missing feature inputs: {', '.join(sorted(set(missing)))}")
+    return order
+
+def compute(df, names, history=None):
+    """
+    Add every feature in `names` (and only what they need) to `df`, each computed once.
+    `history` is the full feature table that as-of lookups search; pass it whenever
+    `df` has been filtered (it defaults to `df` itself).
+    """
+    history = df if history is None else history
+    for name in plan(names, set(df.columns)):
+        f = REGISTRY[name]
+        missing = [c for c in f.history if c not in history.columns]
+        if missing:
+            raise MissingInputError(f"Missing feature inputs: {', '.join(missing)}")
+        df[name] = f.kernel(*[df[c] for c in f.inputs], *[history[c] for c in f.history])
+    return df
+
+# --- OPPONENT (AS-OF) COLUMNS ---
+for _col in ['season_team_poss', 'roll3_team_poss', 'season_opp_eFG', 'season_team_FTR', 'season_team_3PR']:
+    opponent_feature(_col)
+
+# Opponent's 5-game volatility entering the game = its post-game value from its last game
+for _x in ['score', 'margin', 'pace']:
+    opponent_feature(f'roll5_team_{_x}_std', f'opp_roll5_{_x}_volatility')
+
+# --- SPREAD / MATCHUP FEATURES ---
+@feature('off_advantage', ['prev_season_eFG', 'opp_season_opp_eFG'])
+def _off_advantage(own_efg, opp_allowed_efg):
+    """My offense vs your defense (the eFG% the opponent allows)."""
+    return own_efg - opp_allowed_efg
+
+@feature('def_advantage', ['prev_season_opp_eFG', 'opp_season_team_eFG'])
+def _def_advantage(own_allowed_efg, opp_efg):
+    """My defense vs your offense."""
+    return own_allowed_efg - opp_efg
+
+@feature('diff_3PR', ['prev_season_3PR', 'opp_season_team_3PR'])
+def _diff_3pr(own, opp):
+    """3-point reliance gap: if I shoot a ton of 3s and you don't..."""
+    return own - opp
+
+@feature('glass_advantage', ['prev_season_orb', 'opp_season_team_ORB'])
+def _glass_advantage(own, opp):
+    return own - opp
+
+@feature('diff_volatility', ['roll5_score_volatility', 'opp_roll5_score_volatility'])
+def _diff_volatility(own, opp):
+    """Volatility gap (chaos factor)."""
+    return own - opp
+
+@feature('momentum_gap', ['prev_roll3_eFG', 'prev_season_eFG'])
+def _momentum_gap(roll3, season):
+    return roll3 - season
+
+# --- TOTALS FEATURES ---
+@feature('combined_pace', ['prev_season_poss', 'opp_season_team_poss'])
+def _combined_pace(own, opp):
+    return own + opp
+
+@feature('pace_momentum', ['prev_roll3_poss', 'opp_roll3_team_poss', 'combined_pace'])
+def _pace_momentum(own_roll3, opp_roll3, combined):
+    return (own_roll3 + opp_roll3) - combined
+
+@feature('scoring_environment', ['off_advantage', 'opp_season_team_eFG', 'prev_season_opp_eFG'])
+def _scoring_environment(off_adv, opp_efg, own_allowed_efg):
+    return off_adv + (opp_efg - own_allowed_efg)
+
+@feature('combined_ftr', ['prev_season_FTR', 'opp_season_team_FTR'])
+def _combined_ftr(own, opp):
+    return own + opp
+
+@feature('pace_to_line_ratio', ['combined_pace', 'total_line'])
+def _pace_to_line_ratio(pace, line):
+    return pace / line.where(line > 0)
@@ -2,10 +2,22 @@ import pandas as pd
 import numpy as np
 import os
 import sys
+import hashlib
+import store
+import manifest
+import team_state
+import ratings
 
 # --- CONFIG ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(BASE_DIR, "cbb_training_data_processed.csv")
+STATE_FILE = os.path.join(store.DATA_DIR, "feature_state.parquet")
+FEATURE_VERSION = 7  # Bump whenever a feature definition or the state layout changes (forces a full recompute)
+
+STATS_COLS = team_state.STATS_COLS
+ROLL_WINDOW = 3
+COVER_WINDOW = 5
+VOL_WINDOW = 5
+VOL_SERIES = ['score', 'margin', 'pace']  # team_score, team_score - opp_score, poss
 
 def clean_stale_data(df):
     print("   -> 🧹 Cleaning stale columns...")
@@ -39,85 +51,350 @@ def calculate_advanced_stats(df):
     df['TS'] = df['team_score'] / (2 * (df['fga'] + 0.44 * df['fta']))
     return df
 
-def calculate_rolling_stats(df):
+class TeamLayout:
+    """
+    Rows sorted by (team_id, day) mapped onto a padded [team x game] grid, so every
+    per-team running quantity is a single NumPy operation along axis 1.
+    """
+
+    def __init__(self, teams):
+        n = len(teams)
+        starts = np.flatnonzero(np.r_[True, teams[1:] != teams[:-1]]) if n else np.zeros(0, dtype=np.int64)
+        self.lengths = np.diff(np.r_[starts, n])
+        self.teams = teams[starts]
+        self.seg = np.repeat(np.arange(len(starts)), self.lengths)
+        self.pos = np.arange(n) - np.repeat(starts, self.lengths)
+        self.shape = (len(starts), int(self.lengths.max()) if n else 0)
+
+    def grid(self, values):
+        out = np.full(self.shape, np.nan)
+        out[self.seg, self.pos] = values
+        return out
+
+def group_expanding(layout, values, total, count):
+    """
+    Expanding means per team, seeded with carried (total, count) per team.
+    Returns (current, lagged, new_total, new_count).
+    """
+    g = layout.grid(values)
+    ok = ~np.isnan(g)
+    # cumsum along a row is strictly sequential, so a seeded run gives bit-for-bit
+    # the same sums as a full recompute over the team's history
+    sums = np.cumsum(np.concatenate((total[:, None], np.where(ok, g, 0.0)), axis=1), axis=1)
+    cnts = np.cumsum(np.concatenate((count[:, None], ok), axis=1), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / cnts
+    rows = np.arange(layout.shape[0])
+    return (means[layout.seg, layout.pos + 1], means[layout.seg, layout.pos],
+            sums[rows, layout.lengths], cnts[rows, layout.lengths])
+
+def group_trailing(layout, values, tail, w):
+    """
+    Trailing w-game means per team (min 1 value), continuing from each team's last
+    w values (`tail`, oldest first). Returns (current, lagged, new_tail).
+    """
+    ext = np.concatenate((tail, layout.grid(values)), axis=1)
+    ok = ~np.isnan(ext)
+    x = np.where(ok, ext, 0.0)
+    m = layout.shape[1]
+    acc = np.zeros((layout.shape[0], m + 1))
+    cnt = np.zeros((layout.shape[0], m + 1))
+    for k in range(w):  # Oldest value first, same order in full and incremental runs
+        acc += x[:, k:k + m + 1]
+        cnt += ok[:, k:k + m + 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = acc / cnt
+    idx = layout.lengths[:, None] + np.arange(w)
+    new_tail = np.take_along_axis(ext, idx, axis=1)
+    return means[layout.seg, layout.pos + 1], means[layout.seg, layout.pos], new_tail
+
+def _sample_std(count, m2):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count >= 2, np.sqrt(np.maximum(m2, 0.0) / (count - 1)), np.nan)
+
+def group_expanding_std(layout, values, count, mean, m2):
+    """
+    Expanding sample std per team via Welford's streaming update, one game column
+    at a time for every team at once, seeded with carried (count, mean, M2).
+    Returns (current, lagged, count, mean, m2).
+    """
+    g = layout.grid(values)
+    count, mean, m2 = count.astype(float), mean.astype(float), m2.astype(float)
+    std = np.empty((layout.shape[0], layout.shape[1] + 1))
+    std[:, 0] = _sample_std(count, m2)
+    for j in range(layout.shape[1]):
+        v = g[:, j]
+        ok = ~np.isnan(v)
+        count = count + ok
+        delta = np.where(ok, v - mean, 0.0)
+        mean = mean + delta / np.maximum(count, 1.0)
+        m2 = m2 + np.where(ok, delta * (v - mean), 0.0)
+        std[:, j + 1] = _sample_std(count, m2)
+    return std[layout.seg, layout.pos + 1], std[layout.seg, layout.pos], count, mean, m2
+
+def group_trailing_std(layout, values, tail, w):
+    """
+    Trailing w-game sample std per team (needs 2 values), two-pass over each window
+    (mean first, then squared deviations) so it stays stable. Returns (current, lagged, new_tail).
+    """
+    ext = np.concatenate((tail, layout.grid(values)), axis=1)
+    ok = ~np.isnan(ext)
+    x = np.where(ok, ext, 0.0)
+    m = layout.shape[1]
+    acc = np.zeros((layout.shape[0], m + 1))
+    cnt = np.zeros((layout.shape[0], m + 1))
+    for k in range(w):
+        acc += x[:, k:k + m + 1]
+        cnt += ok[:, k:k + m + 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = acc / cnt
+    m2 = np.zeros((layout.shape[0], m + 1))
+    for k in range(w):
+        d = np.where(ok[:, k:k + m + 1], x[:, k:k + m + 1] - mean, 0.0)
+        m2 += d * d
+    std = _sample_std(cnt, m2)
+    idx = layout.lengths[:, None] + np.arange(w)
+    new_tail = np.take_along_axis(ext, idx, axis=1)
+    return std[layout.seg, layout.pos + 1], std[layout.seg, layout.pos], new_tail
+
+def state_columns():
+    cols = ['last_day', 'n_games']
+    for c in STATS_COLS:
+        cols += [f'sum_{c}', f'n_{c}'] + [f'tail{i}_{c}' for i in range(ROLL_WINDOW)]
+    cols += [f'tail{i}_cover_margin' for i in range(COVER_WINDOW)]
+    for x in VOL_SERIES:
+        cols += [f'vn_{x}', f'vmean_{x}', f'vm2_{x}'] + [f'vtail{i}_{x}' for i in range(VOL_WINDOW)]
+    return cols + team_state.SNAPSHOT_COLS
+
+def empty_state():
+    """Per-team running state, one row per team (index = team_id)."""
+    return pd.DataFrame(columns=state_columns(), index=pd.Index([], dtype='int32', name='team_id'))
+
+def calculate_rolling_stats(df, state=None):
+    """
+    Season (expanding) means, 3-game rolls, the 5-game cover-margin roll and
+    score/margin/pace volatility per team, shifted one game so every row only
+    sees games before it.
+    `state` holds each team's running totals and last few values from earlier rows,
+    so only the rows in `df` are computed. Returns (df, updated_state).
+    """
     print("   -> Generating Rolling Averages (Honest Lag)...")
-    df = df.sort_values(['team', 'date']).reset_index(drop=True)
-    
-    stats_cols = ['eFG', 'TS', 'off_rating', 'poss', 'orb', 'to', 'team_score']
-    
-    for col in stats_cols:
-        df[f'season_team_{col}'] = df.groupby('team')[col].expanding().mean().reset_index(level=0, drop=True)
-        df[f'roll3_team_{col}'] = df.groupby('team')[col].rolling(3, min_periods=1).mean().reset_index(level=0, drop=True)
-        
-    for col in stats_cols:
-        df[f'prev_season_{col}'] = df.groupby('team')[f'season_team_{col}'].shift(1)
-        df[f'prev_roll3_{col}'] = df.groupby('team')[f'roll3_team_{col}'].shift(1)
-        
-    # --- FIX IS HERE ---
-    df['cover_margin'] = df['team_score'] + df['spread'] - df['opp_score']
-    
-    # 1. Calculate the rolling stats
-    roll_vals = df.groupby('team')['cover_margin'].rolling(5, min_periods=1).mean().reset_index(level=0, drop=True)
-    
-    # 2. Assign to DF (So the column exists!)
-    df['roll5_cover_margin'] = roll_vals
-    
-    # 3. NOW shift it (Safe because the column exists)
-    df['roll5_cover_margin'] = df.groupby('team')['roll5_cover_margin'].shift(1)
-    
-    return df
+    # Integer sort keys (team_id, day) instead of comparing team-name strings
+    df = df.sort_values(['team_id', 'day'], kind='stable').reset_index(drop=True)
+    state = empty_state() if state is None else state
+    layout = TeamLayout(df['team_id'].to_numpy())
 
-def merge_opponent_stats(df):
-    print("   -> Merging opponent entering stats...")
-    
-    req_cols = ['date', 'team', 'prev_season_eFG', 'prev_season_orb', 'prev_season_to', 'prev_season_off_rating']
-    opp_lookup = df[req_cols].copy()
-    
-    rename_map = {
-        'team': 'opponent_name',
-        'prev_season_eFG': 'opp_season_team_eFG',
-        'prev_season_orb': 'opp_season_team_ORB',
-        'prev_season_to': 'opp_season_team_TO',
-        'prev_season_off_rating': 'opp_season_off_rating'
+    # Carried seeds for the teams in this batch (new teams start from nothing)
+    prior = state.reindex(layout.teams)
+    nxt = pd.DataFrame(index=pd.Index(layout.teams, name='team_id'))
+    nxt['last_day'] = df['day'].to_numpy()[np.cumsum(layout.lengths) - 1]
+    nxt['n_games'] = prior['n_games'].fillna(0).to_numpy(dtype=np.int64) + layout.lengths
+
+    out = {}
+    for c in STATS_COLS:
+        v = df[c].to_numpy(dtype=float)
+        total = prior[f'sum_{c}'].fillna(0.0).to_numpy(dtype=float)
+        count = prior[f'n_{c}'].fillna(0).to_numpy(dtype=np.int64)
+        tail_cols = [f'tail{i}_{c}' for i in range(ROLL_WINDOW)]
+        tail = prior[tail_cols].to_numpy(dtype=float)
+
+        season, prev_season, nxt[f'sum_{c}'], nxt[f'n_{c}'] = group_expanding(layout, v, total, count)
+        roll, prev_roll, new_tail = group_trailing(layout, v, tail, ROLL_WINDOW)
+        nxt[tail_cols] = new_tail
+        out[c] = (season, roll, prev_season, prev_roll)
+
+    cover = (df['team_score'] + df['spread'] - df['opp_score']).to_numpy(dtype=float)
+    tail_cols = [f'tail{i}_cover_margin' for i in range(COVER_WINDOW)]
+    roll_cover, prev_cover, nxt[tail_cols] = group_trailing(layout, cover, prior[tail_cols].to_numpy(dtype=float), COVER_WINDOW)
+
+    # Volatility: expanding (Welford) and 5-game std of scores, margins and pace
+    series = {
+        'score': df['team_score'].to_numpy(dtype=float),
+        'margin': (df['team_score'] - df['opp_score']).to_numpy(dtype=float),
+        'pace': df['poss'].to_numpy(dtype=float),
     }
-    opp_lookup = opp_lookup.rename(columns=rename_map)
-    
-    df_merged = pd.merge(df, opp_lookup, left_on=['date', 'opponent'], right_on=['date', 'opponent_name'], how='left', suffixes=('', '_dupe'))
-    
-    df_merged['diff_eFG'] = df_merged['prev_season_eFG'] - df_merged['opp_season_team_eFG']
-    df_merged['diff_Rebound'] = df_merged['prev_season_orb'] - df_merged['opp_season_team_ORB']
-    df_merged['diff_TO'] = df_merged['prev_season_to'] - df_merged['opp_season_team_TO']
-    df_merged['momentum_gap'] = df_merged['prev_roll3_eFG'] - df_merged['prev_season_eFG']
-    
-    if 'opponent_name' in df_merged.columns:
-        df_merged = df_merged.drop(columns=['opponent_name'])
+    vol = {}
+    for x, v in series.items():
+        seeds = [prior[f'vn_{x}'].fillna(0), prior[f'vmean_{x}'].fillna(0.0), prior[f'vm2_{x}'].fillna(0.0)]
+        season_std, prev_season_std, nxt[f'vn_{x}'], nxt[f'vmean_{x}'], nxt[f'vm2_{x}'] = group_expanding_std(
+            layout, v, *[s.to_numpy(dtype=float) for s in seeds])
+        tail_cols = [f'vtail{i}_{x}' for i in range(VOL_WINDOW)]
+        roll_std, prev_roll_std, nxt[tail_cols] = group_trailing_std(layout, v, prior[tail_cols].to_numpy(dtype=float), VOL_WINDOW)
+        vol[x] = (season_std, roll_std, prev_season_std, prev_roll_std)
+
+    # Post-game values of each team's last row: its as-of snapshot going forward
+    last = np.cumsum(layout.lengths) - 1
+    for c in STATS_COLS:
+        nxt[f'season_team_{c}'] = out[c][0][last]
+        nxt[f'roll3_team_{c}'] = out[c][1][last]
+    nxt['roll5_team_cover_margin'] = roll_cover[last]
+
+    for c in STATS_COLS:
+        df[f'season_team_{c}'] = out[c][0]
+        df[f'roll3_team_{c}'] = out[c][1]
+    for c in STATS_COLS:
+        df[f'prev_season_{c}'] = out[c][2]
+        df[f'prev_roll3_{c}'] = out[c][3]
+    df['cover_margin'] = cover
+    df['roll5_cover_margin'] = prev_cover
+    df['roll5_team_cover_margin'] = roll_cover
+    for x in VOL_SERIES:
+        df[f'season_team_{x}_std'] = vol[x][0]
+        df[f'roll5_team_{x}_std'] = vol[x][1]
+    for x in VOL_SERIES:
+        df[f'prev_season_{x}_std'] = vol[x][2]
+        df[f'roll5_{x}_volatility'] = vol[x][3]
+
+    state = pd.concat([state.drop(index=layout.teams, errors='ignore'), nxt[state_columns()]])
+    return df, state.sort_index()
+
+def save_state(state, meta):
+    """Persist per-team running state (one row per team) plus its watermark."""
+    store.atomic_write(STATE_FILE, state.to_parquet)
+    manifest.set_meta('feature_state', meta)
+
+def load_state():
+    """Returns (state, meta), or (empty state, None) when there is nothing usable on disk."""
+    meta = manifest.get_meta('feature_state')
+    if meta is None or not os.path.exists(STATE_FILE):
+        return empty_state(), None
+    return pd.read_parquet(STATE_FILE), meta
+
+def merge_opponent_stats(df, history=None):
+    """
+    Opponent entering stats via the as-of team store: the opponent's stats after its
+    last game before this date, so rows no longer need an exact (date, opponent) match.
+    `history` holds earlier snapshot rows when only a new batch is being computed.
+    """
+    print("   -> Merging opponent entering stats...")
+    rows = df if history is None else pd.concat([history, df[['team_id', 'day'] + team_state.SNAPSHOT_COLS]], ignore_index=True)
+    ts = team_state.TeamStateStore.from_features(rows)
+
+    own = ts.asof_bulk(df['team_id'], df['day'])
+    opp = ts.asof_bulk(df['opp_id'], df['day'])
+
+    df['opp_season_team_eFG'] = opp['season_team_eFG'].to_numpy()
+    df['opp_season_team_ORB'] = opp['season_team_orb'].to_numpy()
+    df['opp_season_team_TO'] = opp['season_team_to'].to_numpy()
+    df['opp_season_off_rating'] = opp['season_team_off_rating'].to_numpy()
+
+    matchup = team_state.matchup_features(own, opp)
+    for col in ['diff_eFG', 'diff_Rebound', 'diff_TO', 'momentum_gap']:
+        df[col] = matchup[col].to_numpy()
+    df['rest_days'] = team_state.rest_days(df['day'], own['last_game_day']).to_numpy()
         
-    return df_merged
+    return df
+
+def snapshot_rows(state):
+    """The carried state as as-of rows (one per team, dated at its last game)."""
+    snap = state.reset_index().rename(columns={'last_day': 'day'})
+    return snap[['team_id', 'day'] + team_state.SNAPSHOT_COLS]
+
+def team_snapshot(state, rating_state, through_day):
+    """
+    Every team's entering state for games after `through_day`, one row per team_id:
+    the post-game stats of its last game (float32, as in the compact feature table)
+    and its ratings after the last solved day.
+    """
+    snap = state[['last_day'] + team_state.SNAPSHOT_COLS].rename(columns={'last_day': 'last_game_day'})
+    snap = snap.astype({c: 'float32' for c in team_state.SNAPSHOT_COLS}).astype({'last_game_day': 'int32'})
+    snap = snap.join(ratings.latest(rating_state))
+    snap['through_day'] = np.int32(through_day)
+    snap.index = snap.index.astype('int32')
+    return snap.reset_index()
+
+def write_snapshot(state, rating_state, watermark):
+    store.write_team_snapshot(team_snapshot(state, rating_state, store.day_numbers([watermark])[0]))
 
-def main():
+def state_is_current(meta):
+    """The carried state is only valid if nothing at or before its watermark changed."""
+    return (
+        meta is not None
+        and os.path.exists(ratings.STATE_FILE)
+        and meta.get('version') == FEATURE_VERSION
+        and bool(store.partition_keys(store.FEATURES))
+        and manifest.prefix_hash(store.GAMES, meta['watermark']) == meta['games_hash']
+    )
+
+def fingerprint():
+    """What the feature output depends on: the raw games and the feature definitions."""
+    key = f"{manifest.content_hash(store.GAMES)}:{FEATURE_VERSION}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def main(full=False):
     print("--- 🧠 FEATURE ENGINEERING (HONEST MODE: FIXED) 🧠 ---")
-    if not os.path.exists(DATA_FILE):
+    store.migrate_legacy_csv()
+    watermark = manifest.last_date(store.GAMES)
+    if watermark is None:
         print("❌ No data file found."); return
 
-    # Suppress Mixed Type Warning
-    df = pd.read_csv(DATA_FILE, low_memory=False)
-    
-    # Normalize Dates
-    df['date'] = pd.to_datetime(df['date']).dt.normalize()
+    fp = fingerprint()
+    if not full:
+        cached = store.read_feature_cache(fp)
+        if cached is not None:
+            print(f"✅ Inputs unchanged (fingerprint {fp[:12]}), using cached features.")
+            if store.read_team_snapshot() is None:
+                state, meta = load_state()
+                if state_is_current(meta):
+                    write_snapshot(state, ratings.load_state(), pd.Timestamp(meta['watermark']))
+            return cached
+
+    state, meta = load_state()
+    if not full and not state_is_current(meta):
+        print("   -> ♻️  No valid carried state (first run, backfill or new feature version). Full recompute.")
+        full = True
+
+    if full:
+        state = empty_state()
+        rating_state = None
+        df = store.load_games()
+    else:
+        # Typed columns straight from the columnar store, only the days after the watermark
+        since = pd.Timestamp(meta['watermark']) + pd.Timedelta(days=1)
+        df = store.read_table(store.GAMES, start=since)
+        rating_state = ratings.load_state()
+        if df.empty:
+            print(f"✅ Features already current through {meta['watermark']}.")
+            if store.read_team_snapshot() is None:
+                write_snapshot(state, rating_state, pd.Timestamp(meta['watermark']))
+            out = store.compact(store.read_table(store.FEATURES))
+            store.write_feature_cache(fp, out)
+            return out
+        print(f"   -> ➕ Incremental update: {len(df)} new rows since {meta['watermark']}")
     
     df = clean_stale_data(df)
+    df = store.add_keys(df)
     
     cols = ['team_score', 'opp_score', 'spread']
     for c in cols: df[c] = pd.to_numeric(df[c], errors='coerce')
     
     df = calculate_advanced_stats(df)
-    df = calculate_rolling_stats(df)
+    history = None if full else snapshot_rows(state)
+    df, state = calculate_rolling_stats(df, state)
     df['ats_win'] = (df['team_score'] + df['spread'] > df['opp_score']).astype(int)
     
-    df_final = merge_opponent_stats(df)
+    df_final = merge_opponent_stats(df, history)
+    df_final, rating_history, rating_state = ratings.add_ratings(df_final, rating_state)
     
     print(f"✅ Saving processed data ({len(df_final)} rows)...")
-    df_final.to_csv(DATA_FILE, index=False)
+    if full:
+        store.replace_table(store.FEATURES, df_final)
+        store.replace_table(store.RATINGS, rating_history)
+    else:
+        store.upsert_by_date(store.FEATURES, df_final)
+        store.upsert_by_date(store.RATINGS, rating_history)
+    ratings.save_state(rating_state)
+
+    last_key = watermark.strftime('%Y-%m-%d')
+    save_state(state, {
+        'watermark': last_key,
+        'games_hash': manifest.prefix_hash(store.GAMES, last_key),
+        'version': FEATURE_VERSION
+    })
+    write_snapshot(state, rating_state, watermark)
+    out = store.compact(df_final if full else store.read_table(store.FEATURES))
+    store.write_feature_cache(fp, out)
+    return out
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(full='--full' in sys.argv)
\ No newline at end of file
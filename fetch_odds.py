@@ -1,67 +1,123 @@
-import requests
 import pandas as pd
 from datetime import timedelta, date
-import time
+import json
 import os
+import espn
+import payload_cache
+import store
 
 # --- CONFIG ---
 START_DATE = date(2024, 11, 4) # Start of 24-25 Season
 END_DATE = date.today()
 OUTPUT_FILE = "espn_odds_history.csv"
+CHECKPOINT_FILE = "espn_odds_checkpoint.json"
+SCOREBOARD_PARAMS = {'limit': 500}
+COLUMNS = ["date", "home_team", "away_team", "total_line", "spread_details"]
+CHECKPOINT_EVERY = 10  # Dates between checkpoint flushes
+
+def load_checkpoint():
+    """Dates whose slates were final when scanned (never fetched again)."""
+    try:
+        with open(CHECKPOINT_FILE) as f:
+            return set(json.load(f).get('final_dates', []))
+    except (OSError, ValueError):
+        return set()
+
+def save_checkpoint(final_dates):
+    def write(tmp):
+        with open(tmp, 'w') as f:
+            json.dump({'final_dates': sorted(final_dates)}, f, indent=1)
+    store.atomic_write(CHECKPOINT_FILE, write)
+
+def parse_odds(data, current_date):
+    rows = []
+    for event in data.get('events', []):
+        comp = event['competitions'][0]
+
+        # We need completed games with Odds
+        if not comp.get('odds'): continue
+
+        # Teams
+        home_team = comp['competitors'][0]['team']['displayName']
+        away_team = comp['competitors'][1]['team']['displayName']
+
+        # Odds
+        odds = comp['odds'][0]
+        # ESPN gives "overUnder" directly usually
+        total = odds.get('overUnder')
+        details = odds.get('details') # Spread string like "DUKE -5.0"
+
+        if total:
+            rows.append({
+                "date": current_date,
+                "home_team": home_team,
+                "away_team": away_team,
+                "total_line": total,
+                "spread_details": details
+            })
+    return rows
+
+def append_rows(rows):
+    """Stream one date's rows to disk as soon as they arrive."""
+    write_header = not os.path.exists(OUTPUT_FILE) or os.path.getsize(OUTPUT_FILE) == 0
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(OUTPUT_FILE, mode='a', header=write_header, index=False)
+
+def compact():
+    """Drop rows superseded by a re-scan (non-final dates) and sort by date."""
+    if not os.path.exists(OUTPUT_FILE) or os.path.getsize(OUTPUT_FILE) == 0:
+        return 0
+    df = pd.read_csv(OUTPUT_FILE)
+    df = df.drop_duplicates(subset=["date", "home_team", "away_team"], keep='last')
+    df = df.sort_values('date', kind='stable')
+    df.to_csv(OUTPUT_FILE, index=False)
+    return len(df)
 
 def fetch_history():
     print(f"--- 🕰️ SPINNING UP THE TIME MACHINE ({START_DATE} to {END_DATE}) ---")
-    
-    all_odds = []
+
+    # Resume: skip every date already checkpointed as final
+    final_dates = load_checkpoint()
+    dates = []
     current_date = START_DATE
-    
     while current_date <= END_DATE:
-        date_str = current_date.strftime("%Y%m%d")
-        print(f"   -> Scanning {current_date}...", end="\r")
-        
-        url = f"http://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/scoreboard?dates={date_str}&limit=500"
-        
-        try:
-            res = requests.get(url)
-            data = res.json()
-            
-            for event in data.get('events', []):
-                comp = event['competitions'][0]
-                
-                # We need completed games with Odds
-                if not comp.get('odds'): continue
-                
-                # Teams
-                home_team = comp['competitors'][0]['team']['displayName']
-                away_team = comp['competitors'][1]['team']['displayName']
-                
-                # Odds
-                odds = comp['odds'][0]
-                # ESPN gives "overUnder" directly usually
-                total = odds.get('overUnder')
-                details = odds.get('details') # Spread string like "DUKE -5.0"
-                
-                if total:
-                    all_odds.append({
-                        "date": current_date,
-                        "home_team": home_team,
-                        "away_team": away_team,
-                        "total_line": total,
-                        "spread_details": details
-                    })
-                    
-        except Exception as e:
-            print(f"\n      ❌ Error on {date_str}: {e}")
-            
+        if current_date.isoformat() not in final_dates:
+            dates.append(current_date)
         current_date += timedelta(days=1)
-        # Be nice to the API
-        time.sleep(0.1)
+    print(f"   -> {len(final_dates)} dates checkpointed, {len(dates)} to scan")
 
-    print(f"\n✅ Scan Complete. Found {len(all_odds)} games with betting lines.")
-    
-    df = pd.DataFrame(all_odds)
-    df.to_csv(OUTPUT_FILE, index=False)
+    # Concurrent, rate-limited fetch (the shared limiter keeps us nice to the API)
+    found = 0
+    since_flush = 0
+    try:
+        for current_date, data in espn.iter_scoreboards(dates, params=SCOREBOARD_PARAMS):
+            print(f"   -> Scanning {current_date}...", end="\r")
+            if data is None:
+                print(f"\n      ❌ Error on {current_date.strftime('%Y%m%d')}")
+                continue
+
+            try:
+                rows = parse_odds(data, current_date)
+            except Exception as e:
+                print(f"\n      ❌ Error on {current_date.strftime('%Y%m%d')}: {e}")
+                continue
+
+            if rows:
+                append_rows(rows)
+                found += len(rows)
+
+            # Only finished slates are checkpointed; live ones get re-scanned next run
+            if payload_cache.is_final(data, current_date):
+                final_dates.add(current_date.isoformat())
+                since_flush += 1
+                if since_flush >= CHECKPOINT_EVERY:
+                    save_checkpoint(final_dates)
+                    since_flush = 0
+    finally:
+        save_checkpoint(final_dates)
+
+    total = compact()
+    print(f"\n✅ Scan Complete. Found {found} new games with betting lines ({total} total).")
     print(f"   -> Saved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    fetch_history()
\ No newline at end of file
+    fetch_history()
@@ -1,16 +1,16 @@
 import pandas as pd
 import numpy as np
-import requests
 import os
 from datetime import datetime, timedelta
 import pytz
-from difflib import get_close_matches
+import espn
+import strategy
+import team_names
 
 # --- CONFIG ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PRED_FILE = os.path.join(BASE_DIR, "daily_predictions.csv")
 PERF_FILE = os.path.join(BASE_DIR, "performance_log.csv")
-BASE_URL = "http://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/scoreboard?groups=50&limit=1000"
 
 def normalize_team_name(name):
     """Normalize team names for matching."""
@@ -28,14 +28,13 @@ def fetch_completed_games(date_obj):
     """
     print(f"   -> Fetching completed games for {date_obj.strftime('%Y-%m-%d')}...")
     
-    date_str = date_obj.strftime("%Y%m%d")
-    url = f"{BASE_URL}&dates={date_str}"
-    
     games = {}
     
     try:
-        res = requests.get(url, timeout=10)
-        data = res.json()
+        # Served from the payload cache once every game on the date is final
+        data = espn.fetch_scoreboard(date_obj)
+        if data is None:
+            raise ConnectionError("ESPN did not respond")
         
         for event in data.get('events', []):
             # Only process completed games
@@ -91,7 +90,15 @@ def fetch_completed_games(date_obj):
         print(f"      ❌ Error fetching games: {e}")
         return {}
 
-def match_prediction_to_game(pred_matchup, games):
+def team_key(name, resolver):
+    """The resolved team name, or the raw name when unresolvable (so exact names still pair up)."""
+    return resolver.resolve(name) or name
+
+def index_games(games, resolver):
+    """Completed games keyed by resolved (home, away) names, for O(1) matching."""
+    return {(team_key(home, resolver), team_key(away, resolver)): result for (home, away), result in games.items()}
+
+def match_prediction_to_game(pred_matchup, game_index, resolver):
     """
     Try to match a prediction matchup to an actual game.
     pred_matchup format: "Away @ Home"
@@ -102,20 +109,7 @@ def match_prediction_to_game(pred_matchup, games):
         return None
     
     pred_away, pred_home = parts
-    
-    # Try exact match first
-    for (game_home, game_away), result in games.items():
-        if game_home == pred_home and game_away == pred_away:
-            return result
-    
-    # Try fuzzy matching
-    for (game_home, game_away), result in games.items():
-        # Check if key parts of names match
-        if (pred_home in game_home or game_home in pred_home) and \
-           (pred_away in game_away or game_away in pred_away):
-            return result
-    
-    return None
+    return game_index.get((team_key(pred_home, resolver), team_key(pred_away, resolver)))
 
 def grade_pick(pick_str, spread, home_score, away_score, matchup):
     """
@@ -185,10 +179,9 @@ def grade_predictions():
         print(f"✅ Loaded {total_preds} predictions from file")
         
         # CRITICAL: Filter for actionable bets only (conf >= 53%)
-        CONFIDENCE_THRESHOLD = 0.53
-        preds = preds[preds['Conf'] >= CONFIDENCE_THRESHOLD].copy()
+        preds = preds[preds['Conf'] >= strategy.CONFIDENCE_THRESHOLD].copy()
         
-        print(f"   Filtered to {len(preds)} actionable bets (conf >= {CONFIDENCE_THRESHOLD:.0%})")
+        print(f"   Filtered to {len(preds)} actionable bets (conf >= {strategy.CONFIDENCE_THRESHOLD:.0%})")
         if len(preds) < total_preds:
             print(f"   Skipped {total_preds - len(preds)} low-confidence predictions")
             
@@ -216,6 +209,8 @@ def grade_predictions():
     
     # 6. Grade each prediction
     print(f"\n📝 Grading predictions...")
+    resolver = team_names.TeamResolver()
+    game_index = index_games(completed_games, resolver)
     
     graded_bets = []
     unmatched = []
@@ -227,7 +222,7 @@ def grade_predictions():
         spread = pred.get('Spread', 0.0)
         
         # Find the corresponding game
-        game_result = match_prediction_to_game(matchup, completed_games)
+        game_result = match_prediction_to_game(matchup, game_index, resolver)
         
         if game_result is None:
             # Couldn't find this game - might be for today/tomorrow
@@ -265,6 +260,8 @@ def grade_predictions():
         result_icon = "✅" if pick_correct else "❌"
         print(f"   {result_icon} {matchup}: {pick} ({'WIN' if pick_correct else 'LOSS'})")
     
+    resolver.save()
+
     print(f"\n📊 Grading Summary:")
     print(f"   Graded: {len(graded_bets)}")
     print(f"   Unmatched: {len(unmatched)}")
@@ -297,13 +294,13 @@ def grade_predictions():
         # Show win rate
         wins = sum(graded_df['pick_correct'])
         win_rate = wins / len(graded_df)
-        profit = sum(1.0 if x else -1.1 for x in graded_df['pick_correct'])
+        profit = strategy.units(graded_df['pick_correct']).sum()
         
         print(f"\n🎯 Yesterday's Performance:")
         print(f"   Record: {wins}-{len(graded_df)-wins}")
         print(f"   Win Rate: {win_rate:.1%}")
         print(f"   Profit: {profit:+.2f} units")
-        print(f"   (Only includes bets with ≥53% confidence)")
+        print(f"   (Only includes bets with ≥{strategy.CONFIDENCE_THRESHOLD:.0%} confidence)")
     else:
         print("\n⚠️  No predictions were graded.")
         print("   This likely means the predictions file contains games for today/tomorrow.")
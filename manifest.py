@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, date
+import pandas as pd
+
+# --- CONFIG ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_FILE = os.path.join(BASE_DIR, "data", "manifest.json")
+
+_lock = threading.Lock()
+
+def frame_hash(df):
+    """Order-sensitive content hash of a frame (values + column names)."""
+    h = hashlib.sha256(",".join(map(str, df.columns)).encode())
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+def schema_hash(df):
+    schema = [[str(c), str(t)] for c, t in df.dtypes.items()]
+    return hashlib.sha256(json.dumps(schema).encode()).hexdigest()
+
+def load():
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'tables': {}}
+
+def _save(data):
+    import store
+    def write(tmp):
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+    store.atomic_write(MANIFEST_FILE, write)
+
+def _is_date_key(key):
+    try:
+        datetime.strptime(key, '%Y-%m-%d')
+        return True
+    except ValueError:
+        return False
+
+def _finalize(entry):
+    """
+    Recompute the watermark and table-level content hash from the partitions.
+    Only date keys count toward the watermark (season tables are keyed by year).
+    """
+    parts = entry['partitions']
+    keys = sorted(parts)
+    dates = [k for k in keys if _is_date_key(k)]
+    entry['last_date'] = dates[-1] if dates else None
+    entry['rows'] = sum(p['rows'] for p in parts.values())
+    h = hashlib.sha256()
+    for k in keys:
+        h.update(f"{k}:{parts[k]['hash']}\n".encode())
+    entry['content_hash'] = h.hexdigest()
+    entry['updated_at'] = datetime.now().isoformat(timespec='seconds')
+
+def record(table, written, removed=(), replace=False):
+    """
+    Atomically record written partitions ({key: frame}) and removed keys for a table.
+    replace=True forgets every partition not in `written` (whole-table rewrite).
+    """
+    stats = {key: (len(df), frame_hash(df), schema_hash(df)) for key, df in written.items()}
+    return record_stats(table, stats, removed=removed, replace=replace)
+
+def record_stats(table, stats, removed=(), replace=False):
+    """Same as record(), for writers that hashed their data while streaming it."""
+    with _lock:
+        data = load()
+        entry = data['tables'].get(table, {'partitions': {}})
+        if replace:
+            entry['partitions'] = {}
+        for key, (rows, content, schema) in stats.items():
+            entry['partitions'][key] = {'rows': int(rows), 'hash': content}
+            entry['schema_hash'] = schema
+        for key in removed:
+            entry['partitions'].pop(key, None)
+        _finalize(entry)
+        data['tables'][table] = entry
+        _save(data)
+        return entry
+
+def table_info(table):
+    """The manifest entry for a table, rebuilt from the store if it was never recorded."""
+    entry = load()['tables'].get(table)
+    if entry is None:
+        import store
+        keys = store.partition_keys(table)
+        if not keys:
+            return None
+        print(f"   -> 🧾 Building manifest for '{table}' ({len(keys)} partitions)...")
+        entry = record(table, {k: store.read_partition(table, k) for k in keys}, replace=True)
+    return entry
+
+def last_date(table):
+    """Watermark: the newest partition date recorded for a table (or None)."""
+    entry = table_info(table)
+    if not entry or not entry.get('last_date') or not _is_date_key(entry['last_date']):
+        return None
+    return datetime.strptime(entry['last_date'], '%Y-%m-%d')
+
+def rows_per_date(table):
+    entry = table_info(table)
+    return {k: p['rows'] for k, p in (entry or {}).get('partitions', {}).items()}
+
+def content_hash(table):
+    entry = table_info(table)
+    return entry['content_hash'] if entry else None
+
+def prefix_hash(table, last_key):
+    """Content hash of every partition up to and including `last_key`."""
+    entry = table_info(table) or {'partitions': {}}
+    h = hashlib.sha256()
+    for k in sorted(entry['partitions']):
+        if k <= last_key:
+            h.update(f"{k}:{entry['partitions'][k]['hash']}\n".encode())
+    return h.hexdigest()
+
+def get_meta(key):
+    return load().get('meta', {}).get(key)
+
+def set_meta(key, value):
+    with _lock:
+        data = load()
+        data.setdefault('meta', {})[key] = value
+        _save(data)
+
+def days_stale(table, today=None):
+    """Days between the watermark and today (None if the table is empty)."""
+    last = last_date(table)
+    if last is None:
+        return None
+    today = today or date.today()
+    return (today - last.date()).days
+
+def last_run(stage):
+    """The last successful pipeline run of a stage (input hash, timing), or None."""
+    return load().get('pipeline', {}).get(stage)
+
+def record_run(stage, input_hash, seconds):
+    with _lock:
+        data = load()
+        data.setdefault('pipeline', {})[stage] = {
+            'input_hash': input_hash,
+            'seconds': round(seconds, 3),
+            'finished_at': datetime.now().isoformat(timespec='seconds')
+        }
+        _save(data)
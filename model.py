@@ -1,25 +1,28 @@
-import pandas as pd
 import numpy as np
 import joblib
 import os
+import store
+import manifest
+import model_registry
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
 
 # --- CONFIG ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(BASE_DIR, "cbb_training_data_processed.csv")
 MODEL_FILE = os.path.join(BASE_DIR, "cbb_model_v1.pkl")
 
-def train_and_evaluate():
+def train_and_evaluate(df=None):
+    """Train the production model. `df` is the processed feature table (loaded if omitted)."""
     print("--- 🤖 TRAINING CBB MODEL (HONEST MODE) 🤖 ---")
     
-    if not os.path.exists(DATA_FILE):
-        print("❌ No processed data found. Run features.py first.")
-        return
-
     # 1. Load Data
-    df = pd.read_csv(DATA_FILE)
+    if df is None:
+        try:
+            df = store.load_processed()
+        except FileNotFoundError:
+            print("❌ No processed data found. Run features.py first.")
+            return
     print(f"   -> Loaded {len(df)} rows.")
 
     # 2. Define Features (Must match what features.py created)
@@ -32,7 +35,8 @@ def train_and_evaluate():
         'diff_Rebound', 
         'diff_TO', 
         'momentum_gap',
-        'roll5_cover_margin'
+        'roll5_cover_margin',
+        'diff_adj_em'
     ]
     
     target = 'ats_win'
@@ -75,9 +79,23 @@ def train_and_evaluate():
     print(f"\n   🎯 Validation Accuracy (Holdout): {acc:.1%}")
     # print(classification_report(y_test, preds)) # Optional detail
     
-    # 7. Save
+    # 7. Save (pickle for compatibility + a memory-mappable registry version)
     joblib.dump(clf, MODEL_FILE)
     print(f"✅ Final Model Saved to {MODEL_FILE}")
 
+    train_dates = df_model.loc[X_train.index, 'date']
+    version = model_registry.register(
+        clf,
+        features=features,
+        params={k: clf.get_params()[k] for k in ['n_estimators', 'max_depth', 'min_samples_leaf', 'random_state']},
+        train_start=train_dates.min().strftime('%Y-%m-%d'),
+        train_end=train_dates.max().strftime('%Y-%m-%d'),
+        train_rows=len(X_train),
+        features_hash=manifest.content_hash(store.FEATURES),
+        holdout_accuracy=round(float(acc), 4)
+    )
+    print(f"✅ Registered as model {version} in {model_registry.REGISTRY_DIR}")
+    return clf
+
 if __name__ == "__main__":
     train_and_evaluate()
\ No newline at end of file
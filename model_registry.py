@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime
+import store
+from compiled_forest import CompiledForest
+
+# --- CONFIG ---
+REGISTRY_DIR = os.path.join(store.DATA_DIR, "models")
+INDEX_FILE = os.path.join(REGISTRY_DIR, "registry.json")
+KEEP_VERSIONS = 10  # Oldest unpinned versions beyond this are deleted
+
+_lock = threading.Lock()
+
+def version_dir(version):
+    return os.path.join(REGISTRY_DIR, version)
+
+def _load_index():
+    try:
+        with open(INDEX_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'versions': {}, 'pinned': None}
+
+def _save_index(index):
+    def write(tmp):
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+    store.atomic_write(INDEX_FILE, write)
+
+def register(clf, **meta):
+    """
+    Compile a fitted forest and store it as the next version (v0001, v0002, ...).
+    `meta` (features window, data hash, metrics...) goes into both the artifact
+    header and the registry index. Returns the version.
+    """
+    compiled = CompiledForest.from_sklearn(clf)
+    with _lock:
+        index = _load_index()
+        numbers = [int(v[1:]) for v in index['versions']]
+        version = f"v{max(numbers, default=0) + 1:04d}"
+        meta = dict(meta, version=version, created_at=datetime.now().isoformat(timespec='seconds'))
+
+        # Written to a temp dir and renamed, so a half-written version is never visible
+        store.atomic_write(version_dir(version), lambda tmp: compiled.save(tmp, **meta))
+
+        index['versions'][version] = meta
+        _prune(index)
+        _save_index(index)
+    return version
+
+def _prune(index):
+    for version in sorted(index['versions'])[:-KEEP_VERSIONS]:
+        if version != index.get('pinned'):
+            shutil.rmtree(version_dir(version), ignore_errors=True)
+            index['versions'].pop(version)
+
+def versions():
+    """{version: metadata}, oldest first."""
+    index = _load_index()
+    return {v: index['versions'][v] for v in sorted(index['versions'])}
+
+def active_version():
+    """The pinned version if there is one, else the newest (None if the registry is empty)."""
+    index = _load_index()
+    if index.get('pinned') in index['versions']:
+        return index['pinned']
+    return max(index['versions'], default=None)
+
+def load(version=None):
+    """Memory-map a version (the active one by default); None if the registry has no models."""
+    version = version or active_version()
+    if version is None:
+        return None
+    return CompiledForest.load(version_dir(version), mmap=True)
+
+def pin(version):
+    """Serve `version` until unpinned, even when newer models are registered."""
+    with _lock:
+        index = _load_index()
+        if version not in index['versions']:
+            raise KeyError(f"Unknown model version {version!r}. Known: {', '.join(sorted(index['versions']))}")
+        index['pinned'] = version
+        _save_index(index)
+
+def unpin():
+    """Go back to serving the newest version."""
+    with _lock:
+        index = _load_index()
+        index['pinned'] = None
+        _save_index(index)
+
+def rollback():
+    """Pin the version before the active one. Returns it (None if there's nothing older)."""
+    current = active_version()
+    older = [v for v in versions() if current and v < current]
+    if not older:
+        return None
+    pin(older[-1])
+    return older[-1]
+
+def main(args):
+    cmd = args[0] if args else 'list'
+    if cmd == 'pin' and len(args) > 1:
+        try:
+            pin(args[1])
+        except KeyError as e:
+            print(f"❌ {e.args[0]}")
+            return
+    elif cmd == 'unpin':
+        unpin()
+    elif cmd == 'rollback':
+        if rollback() is None:
+            print("⚠️ No older version to roll back to.")
+    elif cmd != 'list':
+        print("Usage: python model_registry.py [list | pin <version> | unpin | rollback]")
+        return
+    active = active_version()
+    pinned = _load_index().get('pinned')
+    for version, meta in versions().items():
+        mark = "📌" if version == pinned else ("->" if version == active else "  ")
+        window = f"{meta.get('train_start', '?')} .. {meta.get('train_end', '?')}"
+        print(f"   {mark} {version}  {meta.get('created_at', '')}  trained {window}  acc {meta.get('holdout_accuracy', float('nan')):.1%}")
+    if active is None:
+        print("   (registry is empty: run model.py)")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 import xgboost as xgb
 from sklearn.ensemble import RandomForestClassifier, VotingClassifier
@@ -6,62 +5,36 @@ from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import accuracy_score
 import joblib
 import os
+import store
+import feature_registry
 
-DATA_FILE = "cbb_training_data_processed.csv"
 MODEL_FILE = "cbb_totals_model.pkl"
 
-def create_totals_features(df):
-    """Features specific to Over/Under Prediction."""
-    # 1. Projected Pace
-    if 'season_possessions' in df.columns and 'opp_season_possessions' in df.columns:
-        df['combined_pace'] = df['season_possessions'] + df['opp_season_possessions']
-    else:
-        df['combined_pace'] = 140.0 
-
-    # 2. Pace Momentum
-    if 'roll3_possessions' in df.columns:
-        df['pace_momentum'] = (df['roll3_possessions'] + df['opp_roll3_possessions']) - df['combined_pace']
-    else:
-        df['pace_momentum'] = 0.0
+TOTALS_FEATURES = [
+    'combined_pace', 'pace_momentum', 'scoring_environment', 
+    'combined_ftr', 'pace_to_line_ratio',
+    'roll5_over_margin', 'diff_volatility'
+]
 
-    # 3. Efficiency Matchup
-    matchup_a = df['season_team_eFG'] - df['opp_season_opp_eFG'] 
-    matchup_b = df['opp_season_team_eFG'] - df['season_opp_eFG']
-    df['scoring_environment'] = matchup_a + matchup_b
-    
-    # 4. Foul Rate
-    df['combined_ftr'] = df['season_team_FTR'] + df['opp_season_team_FTR']
-    
-    # 5. Line Value
-    if 'total_line' in df.columns:
-        safe_line = df['total_line'].replace(0, 140)
-        df['pace_to_line_ratio'] = df['combined_pace'] / safe_line
-    else:
-        df['pace_to_line_ratio'] = 1.0
-
-    # 6. Volatility Differential
-    if 'diff_volatility' not in df.columns:
-        if 'roll5_score_volatility' in df.columns and 'opp_roll5_score_volatility' in df.columns:
-            df['diff_volatility'] = df['roll5_score_volatility'] - df['opp_roll5_score_volatility']
-        else:
-            df['diff_volatility'] = 0.0
-
-    if 'roll5_over_margin' not in df.columns:
-        df['roll5_over_margin'] = 0.0
-        
-    return df
+def create_totals_features(df, names=TOTALS_FEATURES, history=None):
+    """
+    Features specific to Over/Under Prediction (defined in feature_registry).
+    `history` is the unfiltered feature table opponent lookups search.
+    Raises MissingInputError instead of filling placeholder constants.
+    """
+    return feature_registry.compute(df, names, history)
 
 def train_totals():
     print("--- 🤖 TRAINING CBB TOTALS MODEL (OVER/UNDER) 🤖 ---")
     
     try:
-        df = pd.read_csv(DATA_FILE)
-        if 'total_over' not in df.columns:
+        full = store.load_processed()
+        if 'total_over' not in full.columns:
             print("   ⚠️ 'total_over' column missing. Re-run features.py.")
             return
 
         # Filter for valid data
-        df = df.dropna(subset=['total_line', 'total_over'])
+        df = full.dropna(subset=['total_line', 'total_over'])
         df = df[df['total_line'] > 100] 
     except FileNotFoundError:
         print("❌ Data file not found."); return
@@ -77,13 +50,14 @@ def train_totals():
         print("   -> Aborting Totals training to prevent bad model.")
         return
 
-    df = create_totals_features(df)
+    try:
+        df = create_totals_features(df, history=full)
+    except feature_registry.MissingInputError as e:
+        print(f"   ❌ {e.args[0]}")
+        print("   -> Aborting Totals training rather than train on placeholder values.")
+        return
     
-    feature_cols = [
-        'combined_pace', 'pace_momentum', 'scoring_environment', 
-        'combined_ftr', 'pace_to_line_ratio',
-        'roll5_over_margin', 'diff_volatility'
-    ]
+    feature_cols = TOTALS_FEATURES
     
     X = df[feature_cols]
     y = df['total_over']
@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+import store
+
+# --- CONFIG ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".cache", "espn")
+LIVE_TTL_SECONDS = 15 * 60              # Slates with upcoming/in-progress games
+MAX_CACHE_BYTES = 256 * 1024 * 1024     # LRU eviction beyond this
+
+_evict_lock = threading.Lock()
+
+def cache_key(target_date, params):
+    """Content address for one scoreboard request: hash of date + sorted query params."""
+    query = {k: str(v) for k, v in (params or {}).items()}
+    query['dates'] = target_date.strftime("%Y%m%d")
+    blob = json.dumps(query, sort_keys=True).encode()
+    return f"{query['dates']}-{hashlib.sha256(blob).hexdigest()[:16]}"
+
+def is_final(payload, target_date):
+    """
+    A slate is immutable once every event is 'post'.
+    An empty slate only counts as final once the date is safely in the past.
+    """
+    events = payload.get('events', [])
+    if events:
+        return all(e.get('status', {}).get('type', {}).get('state') == 'post' for e in events)
+    day = target_date.date() if isinstance(target_date, datetime) else target_date
+    return day < date.today() - timedelta(days=2)
+
+def _path(key, final):
+    return os.path.join(CACHE_DIR, f"{key}.{'final' if final else 'live'}.json.gz")
+
+def _read(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    os.utime(path)  # Mark as recently used for LRU eviction
+    return payload
+
+def get(target_date, params):
+    """Return a cached payload, or None on miss / expired live entry."""
+    key = cache_key(target_date, params)
+    try:
+        return _read(_path(key, True))
+    except (OSError, ValueError):
+        pass
+
+    live = _path(key, False)
+    try:
+        if time.time() - os.path.getmtime(live) < LIVE_TTL_SECONDS:
+            return _read(live)
+    except (OSError, ValueError):
+        pass
+    return None
+
+def put(target_date, params, payload):
+    """Store a payload (atomically). Final slates are never re-fetched."""
+    key = cache_key(target_date, params)
+    final = is_final(payload, target_date)
+
+    def write(tmp):
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+    store.atomic_write(_path(key, final), write)
+
+    if final:
+        try: os.remove(_path(key, False))
+        except OSError: pass
+
+    evict()
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """Drop least-recently-used entries until the cache fits in max_bytes."""
+    with _evict_lock:
+        try:
+            entries = [e for e in os.scandir(CACHE_DIR) if e.name.endswith('.json.gz')]
+        except OSError:
+            return
+        stats = [(st.st_mtime, st.st_size, e.path) for e, st in ((e, e.stat()) for e in entries)]
+        total = sum(s[1] for s in stats)
+        if total <= max_bytes:
+            return
+        for _, size, path in sorted(stats):
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+            if total <= max_bytes:
+                break
@@ -0,0 +1,190 @@
+import ast
+import hashlib
+import os
+import sys
+import time
+import traceback
+import manifest
+import store
+
+# --- CONFIG ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DAILY_TARGETS = ['features', 'backtest']
+
+class Stage:
+    """
+    One node of the pipeline graph.
+    `run(ctx)` returns the stage's in-memory output (None means it produced nothing).
+    Cacheable stages are skipped when their input hash matches the last successful run.
+    """
+
+    def __init__(self, name, deps, run, code, cacheable=True):
+        self.name = name
+        self.deps = deps
+        self.run = run
+        self.code = code
+        self.cacheable = cacheable
+
+def _run_ingest(ctx):
+    import main
+    return main.ingest()
+
+def _run_features(ctx):
+    import features
+    return features.main()
+
+def _run_train(ctx):
+    import model
+    return model.train_and_evaluate(ctx.get('features'))
+
+def _run_backtest(ctx):
+    import backtest
+    return backtest.run_backtest(ctx.get('features'))
+
+def _run_predict(ctx):
+    import predict
+    predict.main(ctx.get('features'))
+    return True
+
+def _run_grade(ctx):
+    import grade_predictions
+    grade_predictions.grade_predictions()
+    return True
+
+# ingest -> features -> {train -> predict -> grade, backtest}
+STAGES = {
+    'ingest': Stage('ingest', [], _run_ingest, ['main.py', 'espn.py'], cacheable=False),
+    'features': Stage('features', ['ingest'], _run_features, ['features.py']),
+    'train': Stage('train', ['features'], _run_train, ['model.py']),
+    'backtest': Stage('backtest', ['features'], _run_backtest, ['backtest.py']),
+    # Live schedule / results change during the day, so these always run
+    'predict': Stage('predict', ['train'], _run_predict, ['predict.py'], cacheable=False),
+    'grade': Stage('grade', ['predict'], _run_grade, ['grade_predictions.py'], cacheable=False),
+}
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+def output_hash(name):
+    """Fingerprint of what a stage leaves on disk (what downstream stages consume)."""
+    if name == 'ingest':
+        return manifest.content_hash(store.GAMES)
+    if name == 'features':
+        return manifest.content_hash(store.FEATURES)
+    if name == 'train':
+        import model
+        return _file_hash(model.MODEL_FILE)
+    return None
+
+def local_imports(path):
+    """Modules of this repo that `path` imports (at any level), as file names."""
+    try:
+        with open(os.path.join(BASE_DIR, path)) as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError):
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name.split('.')[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    return {f"{n}.py" for n in names if os.path.exists(os.path.join(BASE_DIR, f"{n}.py"))}
+
+def code_files(stage):
+    """The stage's own files plus every local module they import, transitively."""
+    seen, todo = set(), list(stage.code)
+    while todo:
+        path = todo.pop()
+        if path not in seen:
+            seen.add(path)
+            todo.extend(local_imports(path) - seen)
+    return sorted(seen)
+
+def input_hash(name):
+    """Hash of the stage's code (and the local modules it imports) plus every upstream output it reads."""
+    stage = STAGES[name]
+    h = hashlib.sha256(name.encode())
+    for path in code_files(stage):
+        h.update(f"{path}:{_file_hash(os.path.join(BASE_DIR, path))}\n".encode())
+    for dep in stage.deps:
+        h.update(f"{dep}:{output_hash(dep)}\n".encode())
+    return h.hexdigest()
+
+def resolve(targets):
+    """Stages needed for `targets`, in dependency order."""
+    order = []
+    def visit(name):
+        if name in order:
+            return
+        if name not in STAGES:
+            raise KeyError(f"Unknown pipeline stage '{name}' (choose from {', '.join(STAGES)})")
+        for dep in STAGES[name].deps:
+            visit(dep)
+        order.append(name)
+    for t in targets:
+        visit(t)
+    return order
+
+def run(targets=DAILY_TARGETS, skip=(), force=False):
+    """
+    Run `targets` and their upstream stages in this process.
+    Stages in `skip` are treated as already satisfied; force=True ignores the cache.
+    Returns {stage: (status, seconds)}.
+    """
+    print("\n--- 🚀 TRIGGERING PIPELINE ---")
+    ctx = {}
+    report = {}
+    failed = set()
+
+    for name in resolve(targets):
+        stage = STAGES[name]
+        if name in skip:
+            report[name] = ('excluded', 0.0)
+            continue
+        if any(dep in failed for dep in stage.deps):
+            failed.add(name)
+            report[name] = ('blocked', 0.0)
+            continue
+
+        key = input_hash(name)
+        last = manifest.last_run(name)
+        if stage.cacheable and not force and last and last['input_hash'] == key:
+            print(f"⏭️  {name}: inputs unchanged since {last['finished_at']}, skipping")
+            report[name] = ('cached', 0.0)
+            continue
+
+        print(f"▶️  {name}...")
+        t0 = time.perf_counter()
+        try:
+            result = stage.run(ctx)
+        except Exception:
+            traceback.print_exc()
+            result = None
+        seconds = time.perf_counter() - t0
+
+        if result is None:
+            failed.add(name)
+            report[name] = ('FAILED', seconds)
+            continue
+
+        ctx[name] = result
+        manifest.record_run(name, key, seconds)
+        report[name] = ('ran', seconds)
+
+    print("\n⏱️  PIPELINE TIMINGS")
+    for name, (status, seconds) in report.items():
+        print(f"   {name:<10} {status:<9} {seconds:7.2f}s")
+    print(f"   {'total':<10} {'':<9} {sum(s for _, s in report.values()):7.2f}s")
+    return report
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    run(args or DAILY_TARGETS, force='--force' in sys.argv)
@@ -1,168 +1,23 @@
 import pandas as pd
 import numpy as np
-import requests
 import joblib
 import os
 from datetime import datetime, timedelta
-from difflib import get_close_matches
+import espn
+import store
+import manifest
+import team_state
+import ratings
+import compiled_forest
+import model_registry
+import team_names
 import pytz
 
 # --- CONFIG ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_FILE = os.path.join(BASE_DIR, "cbb_model_v1.pkl")
-DATA_FILE = os.path.join(BASE_DIR, "cbb_training_data_processed.csv")
 OUTPUT_FILE = os.path.join(BASE_DIR, "daily_predictions.csv")
-BASE_URL = "http://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/scoreboard?groups=50&limit=1000"
-
-# --- TEAM MAP ---
-TEAM_MAP = {
-    "St. Thomas-Minnesota Tommies": "St. Thomas MN",
-    "Elon Phoenix": "Elon",
-    "Campbell Fighting Camels": "Campbell",
-    "App State Mountaineers": "Appalachian St.",
-    "UT Martin Skyhawks": "UT Martin",
-    "Denver Pioneers": "Denver",
-    "Omaha Mavericks": "Omaha",
-    "Texas State Bobcats": "Texas St.",
-    "Weber State Wildcats": "Weber St.",
-    "Idaho State Bengals": "Idaho St.",
-    "Louisiana Ragin' Cajuns": "Louisiana",
-    "UL Monroe Warhawks": "UL Monroe",
-    "Idaho Vandals": "Idaho",
-    "Montana Grizzlies": "Montana",
-    "UTEP Miners": "UTEP",
-    "California Baptist Lancers": "California Baptist",
-    "Utah Tech Trailblazers": "Utah Tech",
-    "Drake Bulldogs": "Drake",
-    "Butler Bulldogs": "Butler",
-    "Miami (OH) RedHawks": "Miami OH",
-    "Ball State Cardinals": "Ball St.",
-    "Kent State Golden Flashes": "Kent St.",
-    "Iowa Hawkeyes": "Iowa",
-    "DePaul Blue Demons": "DePaul",
-    "UNLV Rebels": "UNLV",
-    "Fresno State Bulldogs": "Fresno St.",
-    "Nevada Wolf Pack": "Nevada",
-    "Furman Paladins": "Furman",
-    "Marquette Golden Eagles": "Marquette",
-    "Xavier Musketeers": "Xavier",
-    "UAB Blazers": "UAB",
-    "Arkansas Razorbacks": "Arkansas",
-    "Duke Blue Devils": "Duke",
-    "Louisville Cardinals": "Louisville",
-    "North Carolina Tar Heels": "North Carolina",
-    "Kentucky Wildcats": "Kentucky",
-    "Kansas Jayhawks": "Kansas",
-    "Auburn Tigers": "Auburn",
-    "Alabama Crimson Tide": "Alabama",
-    "Tennessee Volunteers": "Tennessee",
-    "UConn Huskies": "Connecticut", 
-    "Ole Miss Rebels": "Mississippi", 
-    "NC State Wolfpack": "North Carolina St.",
-    "Miami Hurricanes": "Miami FL", 
-    "USC Trojans": "USC", 
-    "TCU Horned Frogs": "TCU", 
-    "SMU Mustangs": "SMU",
-    "VCU Rams": "VCU", 
-    "LSU Tigers": "LSU", 
-    "BYU Cougars": "BYU", 
-    "UCF Knights": "UCF",
-    "St. John's Red Storm": "St. John's", 
-    "Saint Mary's Gaels": "Saint Mary's", 
-    "Loyola Chicago Ramblers": "Loyola Chicago",
-    "Michigan State Spartans": "Michigan St.", 
-    "Ohio State Buckeyes": "Ohio St.", 
-    "Iowa State Cyclones": "Iowa St.",
-    "Florida State Seminoles": "Florida St.", 
-    "Kansas State Wildcats": "Kansas St.", 
-    "Oklahoma State Cowboys": "Oklahoma St.",
-    "Oregon State Beavers": "Oregon St.", 
-    "Washington State Cougars": "Washington St.", 
-    "Arizona State Sun Devils": "Arizona St.",
-    "Mississippi State Bulldogs": "Mississippi St.", 
-    "Penn State Nittany Lions": "Penn St.", 
-    "Boise State Broncos": "Boise St.",
-    "San Diego State Aztecs": "San Diego St.", 
-    "Utah State Aggies": "Utah St.", 
-    "Colorado State Rams": "Colorado St.",
-    "Michigan Wolverines": "Michigan", 
-    "West Virginia Mountaineers": "West Virginia", 
-    "Gonzaga Bulldogs": "Gonzaga",
-    "Nebraska Cornhuskers": "Nebraska", 
-    "Seattle U Redhawks": "Seattle", 
-    "Stanford Cardinal": "Stanford", 
-    "Massachusetts Minutemen": "Massachusetts", 
-    "UMass Minutemen": "Massachusetts",
-    "Pittsburgh Panthers": "Pittsburgh", 
-    "Illinois Fighting Illini": "Illinois", 
-    "Wisconsin Badgers": "Wisconsin",
-    "Maryland Terrapins": "Maryland", 
-    "Rutgers Scarlet Knights": "Rutgers", 
-    "Northwestern Wildcats": "Northwestern",
-    "Purdue Boilermakers": "Purdue", 
-    "Indiana Hoosiers": "Indiana", 
-    "Minnesota Golden Gophers": "Minnesota",
-    "Texas Longhorns": "Texas",
-    "Texas A&M Aggies": "Texas A&M",
-    "Texas Tech Red Raiders": "Texas Tech",
-    "Baylor Bears": "Baylor",
-    "Houston Cougars": "Houston",
-    "Virginia Cavaliers": "Virginia",
-    "Virginia Tech Hokies": "Virginia Tech",
-    "Clemson Tigers": "Clemson",
-    "Georgia Tech Yellow Jackets": "Georgia Tech",
-    "Wake Forest Demon Deacons": "Wake Forest",
-    "Syracuse Orange": "Syracuse",
-    "Boston College Eagles": "Boston College",
-    "Notre Dame Fighting Irish": "Notre Dame",
-    "Northeastern Huskies": "Northeastern",
-    # --- Newly Added Schools (Jan 2026) ---
-    "Pennsylvania Quakers": "Penn",
-    "UAlbany Great Danes": "Albany NY",
-    "Tulsa Golden Hurricane": "Tulsa",
-    "Tulane Green Wave": "Tulane",
-    "Hawai'i Rainbow Warriors": "Hawaii",
-    "Wagner Seahawks": "Wagner",
-    "Long Island University Sharks": "Long Island"
-}
-
-def find_best_match(name, known_teams):
-    """Match ESPN team name to historical data team name."""
-    if name in TEAM_MAP: 
-        return TEAM_MAP[name]
-    
-    parts = name.split()
-    if len(parts) > 1:
-        no_mascot = " ".join(parts[:-1])
-        if no_mascot in TEAM_MAP: 
-            return TEAM_MAP[no_mascot]
-    
-    matches = get_close_matches(name, known_teams, n=1, cutoff=0.6)
-    if matches:
-        return matches[0]
-    
-    # Log warning for unmatched teams
-    print(f"      ⚠️  WARNING: Could not match '{name}' to historical data")
-    return None
-
-def get_latest_stats(df):
-    """Get the most recent stats for each team."""
-    df['date'] = pd.to_datetime(df['date'])
-    df = df.sort_values('date')
-    latest_stats = {}
-    teams = df['team'].unique()
-    
-    for team in teams:
-        last_game = df[df['team'] == team].iloc[-1]
-        stats = {}
-        for col in df.columns:
-            if any(x in col for x in ['season_', 'roll']):
-                stats[col] = last_game[col]
-        stats['last_game_date'] = last_game['date']
-        stats['last_opponent'] = last_game.get('opponent', 'Unknown')
-        latest_stats[team] = stats
-    
-    return latest_stats
+PRED_COLUMNS = ["Date/Time", "Matchup", "Spread", "Pick", "Conf", "Raw Odds", "Rest", "Home_Matched", "Away_Matched"]
 
 def fetch_schedule():
     """
@@ -183,13 +38,14 @@ def fetch_schedule():
     for days_ahead in [0, 1]:
         target_date = now_eastern + timedelta(days=days_ahead)
         date_str = target_date.strftime("%Y%m%d")
-        url = f"{BASE_URL}&dates={date_str}"
         
         print(f"      Querying ESPN for: {date_str} ({target_date.strftime('%A, %B %d')})")
         
         try:
-            res = requests.get(url, timeout=10)
-            data = res.json()
+            # Cached locally; today's and tomorrow's slates expire after a short TTL
+            data = espn.fetch_scoreboard(target_date)
+            if data is None:
+                raise ConnectionError("ESPN did not respond")
             
             events_count = len(data.get('events', []))
             print(f"         Found {events_count} events")
@@ -251,157 +107,160 @@ def fetch_schedule():
             
     return sorted(games, key=lambda x: x['date'])
 
-def calculate_production_features(row, h_stats, a_stats):
-    """Calculate features needed for prediction."""
-    # 1. Effective Field Goal %
-    row['diff_eFG'] = h_stats.get('season_team_eFG', 0) - a_stats.get('season_team_eFG', 0)
-    
-    # 2. Rebounds
-    h_orb = h_stats.get('season_team_orb', 0) 
-    a_orb = a_stats.get('season_team_orb', 0)
-    row['diff_Rebound'] = h_orb - a_orb
-    
-    # 3. Turnovers
-    h_to = h_stats.get('season_team_to', 0)
-    a_to = a_stats.get('season_team_to', 0)
-    row['diff_TO'] = h_to - a_to
-    
-    # 4. Momentum
-    row['momentum_gap'] = h_stats.get('roll3_team_eFG', 0) - h_stats.get('season_team_eFG', 0)
-    
-    # 5. Cover Margin
-    row['roll5_cover_margin'] = h_stats.get('roll5_cover_margin', 0)
-    
-    return row
+def game_days(dates):
+    """Day numbers of ESPN tip-off timestamps (UTC calendar day, as the schedule is keyed)."""
+    return store.day_numbers(pd.to_datetime(pd.Series(dates), utc=True).dt.tz_localize(None))
+
+def build_slate(schedule, team_stats, team_ratings):
+    """
+    The whole slate as one frame: matched names and IDs, both teams' entering stats
+    (as-of lookups by ID, one searchsorted per side), the model's input columns and
+    a 'Skip Reason' for games that can't be scored.
+    """
+    slate = pd.DataFrame(schedule, columns=['id', 'home_raw', 'away_raw', 'spread', 'date', 'raw_odds'])
 
-def main():
+    # Match team names to historical data (each distinct ESPN name once, cached across runs)
+    matched = team_names.resolve_many(pd.concat([slate['home_raw'], slate['away_raw']]))
+    for name in [n for n, m in matched.items() if m is None]:
+        print(f"      ⚠️  WARNING: Could not match '{name}' to historical data")
+    slate['home_matched'] = slate['home_raw'].map(matched)
+    slate['away_matched'] = slate['away_raw'].map(matched)
+    slate['home_id'] = store.team_ids(slate['home_matched'].fillna(''))
+    slate['away_id'] = store.team_ids(slate['away_matched'].fillna(''))
+
+    # Entering stats as of tip-off day (last game strictly before it)
+    slate['game_day'] = game_days(slate['date'])
+    h_stats = team_stats.asof_bulk(slate['home_id'], slate['game_day'])
+    a_stats = team_stats.asof_bulk(slate['away_id'], slate['game_day'])
+
+    slate['Skip Reason'] = ''
+    no_stats = h_stats['last_game_day'].isna().to_numpy() | a_stats['last_game_day'].isna().to_numpy()
+    slate.loc[no_stats, 'Skip Reason'] = 'No historical stats'
+    slate.loc[slate['home_matched'].isna() | slate['away_matched'].isna(), 'Skip Reason'] = 'Team matching failed'
+
+    # Rest days for BOTH teams; the model uses the home team's, capped at 7 (how it was trained)
+    slate['home_rest'] = (slate['game_day'] - h_stats['last_game_day']).clip(lower=0).to_numpy()
+    slate['away_rest'] = (slate['game_day'] - a_stats['last_game_day']).clip(lower=0).to_numpy()
+    slate['is_home'] = 1
+    slate['rest_days'] = slate['home_rest'].clip(upper=team_state.MAX_REST_DAYS)
+
+    # Production features: same code path the backtest trains on
+    for col, values in team_state.matchup_features(h_stats, a_stats).items():
+        slate[col] = values.to_numpy()
+
+    # Adjusted efficiency edge, from the ratings solved through the day before tip-off
+    h_rating = team_ratings.asof_bulk(slate['home_id'], slate['game_day'])
+    a_rating = team_ratings.asof_bulk(slate['away_id'], slate['game_day'])
+    slate['diff_adj_em'] = ratings.adjusted_margin(h_rating, a_rating).to_numpy()
+    # Training drops rows without ratings, so such games can't be scored either
+    slate.loc[slate['diff_adj_em'].isna() & (slate['Skip Reason'] == ''), 'Skip Reason'] = 'No ratings'
+    return slate
+
+def pick_columns(games, prob):
+    """Display columns for scored games. Picks USE ORIGINAL ESPN NAMES."""
+    home = prob > 0.5
+    picked_spread = pd.Series(np.where(home, games['spread'], -1 * games['spread']), index=games.index, dtype=float)
+    sign = pd.Series(np.where(picked_spread > 0, "+", ""), index=games.index, dtype=str)
+    picked_name = pd.Series(np.where(home, games['home_raw'], games['away_raw']), index=games.index, dtype=str)
+
+    # Format time in Eastern
+    dates = pd.to_datetime(games['date'])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert('US/Eastern')
+
+    return pd.DataFrame({
+        "Date/Time": dates.dt.strftime("%m/%d %I:%M %p"),
+        "Matchup": games['away_raw'].astype(str) + " @ " + games['home_raw'].astype(str),  # ← ORIGINAL NAMES
+        "Spread": games['spread'],
+        "Pick": picked_name + " " + sign + picked_spread.astype(str),
+        "Conf": np.maximum(prob, 1 - prob),
+        "Raw Odds": games['raw_odds'],
+        "Rest": np.where(home, games['home_rest'], games['away_rest']).astype(int),  # ← Show PICKED TEAM's rest days
+        # Debug fields (optional)
+        "Home_Matched": games['home_matched'],
+        "Away_Matched": games['away_matched']
+    }, index=games.index)
+
+def load_team_stores(first_day, df_hist=None):
+    """
+    (team_stats, team_ratings, last data date) for a slate starting on `first_day`.
+    The feature stage's per-team snapshot covers any slate after the day it was built
+    through, in one small read; otherwise the full history is loaded (`df_hist`, the
+    processed feature table, is used if given).
+    """
+    snap = store.read_team_snapshot()
+    if snap is not None and (first_day is None or first_day > snap['through_day'].max()):
+        print(f"   ✅ Team snapshot loaded: {len(snap)} teams")
+        through = pd.Timestamp(int(snap['through_day'].max()), unit='D')
+        return team_state.TeamStateStore.from_snapshot(snap), ratings.load_store(snap), through
+
+    if df_hist is None:
+        df_hist = store.load_processed()
+    print(f"   ✅ Data loaded: {len(df_hist)} historical games")
+    return team_state.TeamStateStore.from_features(df_hist), ratings.load_store(), df_hist['date'].max()
+
+def main(df_hist=None):
+    """
+    Score today's and tomorrow's slate. `df_hist` is the processed feature table,
+    only loaded (if omitted) when the team snapshot can't answer the slate. Returns
+    every scheduled game with its features, pick columns and 'Skip Reason' (empty
+    for scored games).
+    """
     print("--- 🔮 PREDICTION ENGINE (V3.3: TIMEZONE + MATCHUP FIX) 🔮 ---")
     
     # Get current Eastern time for dated file naming
     eastern = pytz.timezone('US/Eastern')
     now_eastern = datetime.now(eastern)
     
-    # Load model and data
-    try:
-        model = joblib.load(MODEL_FILE)
-        print(f"   ✅ Model loaded: {MODEL_FILE}")
-    except:
-        print("❌ Critical: Model not found. Run model.py first.")
-        return
+    # Load model (memory-mapped registry version; the pickle until one is registered) and data
+    model = model_registry.load()
+    if model is not None:
+        print(f"   ✅ Model loaded: {model_registry.active_version()} from {model_registry.REGISTRY_DIR}")
+    else:
+        try:
+            model = compiled_forest.compile_model(joblib.load(MODEL_FILE))
+            print(f"   ✅ Model loaded: {MODEL_FILE}")
+        except:
+            print("❌ Critical: Model not found. Run model.py first.")
+            return
     
+    # Fetch schedule
+    schedule = fetch_schedule()
+    print(f"   -> Found {len(schedule)} games with spreads")
+
+    # Entering team stats and ratings: the per-team snapshot, or the full history if it can't answer this slate
+    first_day = game_days([g['date'] for g in schedule]).min() if schedule else None
     try:
-        df_hist = pd.read_csv(DATA_FILE)
-        print(f"   ✅ Data loaded: {len(df_hist)} historical games")
-    except:
+        team_stats, team_ratings, through = load_team_stores(first_day, df_hist)
+    except FileNotFoundError:
         print("❌ Critical: Training data not found. Run main.py to download data.")
         return
 
-    known_teams = df_hist['team'].unique()
-    team_stats = get_latest_stats(df_hist)
-    
-    # Check data freshness
-    df_hist['date'] = pd.to_datetime(df_hist['date'])
-    last_data_date = df_hist['date'].max()
+    # Check data freshness (watermark from the manifest, no scan)
+    last_data_date = manifest.last_date(store.FEATURES) or through
     print(f"   📊 Data current through: {last_data_date.strftime('%Y-%m-%d')}")
     
     days_old = (datetime.now() - last_data_date).days
     if days_old > 2:
         print(f"   ⚠️  WARNING: Data is {days_old} days old. Run main.py to update!")
     
-    # Fetch schedule
-    schedule = fetch_schedule()
-    print(f"   -> Found {len(schedule)} games with spreads")
-    
-    predictions = []
-    skipped = []
-    
-    for g in schedule:
-        # Match team names to historical data
-        home_matched = find_best_match(g['home_raw'], known_teams)
-        away_matched = find_best_match(g['away_raw'], known_teams)
-        
-        # Skip if we can't match teams or don't have stats
-        if not home_matched or not away_matched:
-            skipped.append(f"{g['away_raw']} @ {g['home_raw']} (Team matching failed)")
-            continue
-            
-        if home_matched not in team_stats or away_matched not in team_stats:
-            skipped.append(f"{g['away_raw']} @ {g['home_raw']} (No historical stats)")
-            continue
+    slate = build_slate(schedule, team_stats, team_ratings)
 
-        # Build feature row
-        row = {'is_home': 1, 'spread': g['spread']}
-        h_stats = team_stats[home_matched]
-        a_stats = team_stats[away_matched]
-        
-        # Calculate rest days for BOTH teams
-        home_last_date = pd.to_datetime(h_stats.get('last_game_date', datetime.now()))
-        away_last_date = pd.to_datetime(a_stats.get('last_game_date', datetime.now()))
-        
-        home_actual_rest = max(0, (g['date'].replace(tzinfo=None) - home_last_date).days)
-        away_actual_rest = max(0, (g['date'].replace(tzinfo=None) - away_last_date).days)
-        
-        # For model: use home team's rest, capped at 7 (if that's how it was trained)
-        row['rest_days'] = min(home_actual_rest, 7)
-        
-        # Add production features
-        row = calculate_production_features(row, h_stats, a_stats)
-        
-        # Prepare for model
-        cols = model.feature_names_in_
-        input_df = pd.DataFrame([row])
-        for c in cols:
-            if c not in input_df.columns: 
-                input_df[c] = 0.0
-        
-        input_df.columns = input_df.columns.astype(str)
-        
-        # Make prediction
-        prob = model.predict_proba(input_df)[0][1]
-        conf = max(prob, 1-prob)
-        
-        # Determine pick - USE ORIGINAL ESPN NAMES
-        if prob > 0.5:
-            sign = "+" if g['spread'] > 0 else ""
-            pick_str = f"{g['home_raw']} {sign}{g['spread']}"  # ← Original name
-            picked_team_rest = home_actual_rest  # Picked home team
-        else:
-            away_spread = -1 * g['spread']
-            sign = "+" if away_spread > 0 else ""
-            pick_str = f"{g['away_raw']} {sign}{away_spread}"  # ← Original name
-            picked_team_rest = away_actual_rest  # Picked away team
-
-        # Format time in Eastern
-        try:
-            local_ts = g['date'].tz_convert('US/Eastern')
-            time_str = local_ts.strftime("%m/%d %I:%M %p")
-        except:
-            time_str = g['date'].strftime("%m/%d %I:%M %p")
-
-        # CRITICAL FIX: Use ORIGINAL ESPN names for display
-        prediction_row = {
-            "Date/Time": time_str,
-            "Matchup": f"{g['away_raw']} @ {g['home_raw']}",  # ← ORIGINAL NAMES
-            "Spread": g['spread'],
-            "Pick": pick_str,
-            "Conf": conf,
-            "Raw Odds": g['raw_odds'],
-            "Rest": picked_team_rest,  # ← Show PICKED TEAM's rest days
-            # Debug fields (optional)
-            "Home_Matched": home_matched,
-            "Away_Matched": away_matched
-        }
-        
-        # VALIDATION: Ensure pick mentions a team that's actually in the matchup
-        pick_team_mentioned = pick_str.split()[0] + " " + pick_str.split()[1]
-        if g['home_raw'] not in pick_str and g['away_raw'] not in pick_str:
-            print(f"      ⚠️  WARNING: Pick '{pick_str}' doesn't match matchup '{prediction_row['Matchup']}'")
-        
-        predictions.append(prediction_row)
+    # One model call for the whole slate (missing model columns default to 0.0).
+    # Like training, rows with any missing model input are left out.
+    cols = [str(c) for c in model.feature_names_in_]
+    incomplete = slate.reindex(columns=cols, fill_value=0.0).isna().any(axis=1)
+    slate.loc[incomplete & (slate['Skip Reason'] == ''), 'Skip Reason'] = 'Missing model inputs'
+    scorable = slate['Skip Reason'] == ''
+    X = slate.loc[scorable].reindex(columns=cols, fill_value=0.0).astype(float)
+    prob = model.predict_proba(X)[:, 1] if len(X) else np.zeros(0)
+    picks = pick_columns(slate.loc[scorable], prob)
+    slate = slate.join(picks)
 
     # Save predictions
-    if predictions:
-        pred_df = pd.DataFrame(predictions).sort_values(by="Conf", ascending=False)
+    if scorable.any():
+        # From the pick frame itself: the join pads skipped games with NaN (Rest would turn float)
+        pred_df = picks[PRED_COLUMNS].sort_values(by="Conf", ascending=False)
         
         # Save to current file (for app)
         pred_df.to_csv(OUTPUT_FILE, index=False)
@@ -424,10 +283,12 @@ def main():
         print("\n⚠️  No predictions generated.")
     
     # Show skipped games
-    if skipped:
+    skipped = slate.loc[~scorable]
+    if len(skipped):
         print(f"\n⚠️  Skipped {len(skipped)} games:")
-        for s in skipped[:5]:
-            print(f"   - {s}")
+        for _, g in skipped.head(5).iterrows():
+            print(f"   - {g['away_raw']} @ {g['home_raw']} ({g['Skip Reason']})")
+    return slate
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
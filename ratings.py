@@ -0,0 +1,170 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import cg
+import store
+import team_state
+
+# --- CONFIG ---
+STATE_FILE = os.path.join(store.DATA_DIR, "ratings_state.npz")
+RATING_COLS = ['adj_off', 'adj_def']
+RIDGE = 5.0        # Pulls teams with few games toward average (in games' worth of evidence)
+CG_RTOL = 1e-10
+CG_MAXITER = 1000
+
+# Unknowns: x[0] = league average, x[1] = home edge, then (offense, defense) per team_id
+MU, HCA = 0, 1
+
+def n_vars(n_teams):
+    return 2 + 2 * n_teams
+
+def off_index(team_ids):
+    return 2 + 2 * np.asarray(team_ids, dtype=np.int64)
+
+def def_index(team_ids):
+    return 3 + 2 * np.asarray(team_ids, dtype=np.int64)
+
+def new_state():
+    """Running normal equations (N x = r) over every game so far, plus the last solution."""
+    return {'N': sparse.csr_matrix((2, 2)), 'r': np.zeros(2), 'x': np.zeros(2)}
+
+def _grow(state, size):
+    """Make room for teams that got IDs since the state was saved."""
+    old = len(state['x'])
+    if size <= old:
+        return state
+    N = state['N'].tocoo()
+    return {
+        'N': sparse.csr_matrix((N.data, (N.row, N.col)), shape=(size, size)),
+        'r': np.r_[state['r'], np.zeros(size - old)],
+        'x': np.r_[state['x'], np.zeros(size - old)],
+    }
+
+def _day_system(team_ids, opp_ids, site, y, size):
+    """
+    One day's contribution to the normal equations. Each team-game is the row
+    y = mu + site * hca + off[team] + def[opp]; every entry of A is 0 or +-1, so N
+    holds exact integer counts.
+    """
+    n = len(y)
+    cols = np.column_stack([np.full(n, MU), np.full(n, HCA), off_index(team_ids), def_index(opp_ids)])
+    vals = np.column_stack([np.ones(n), site, np.ones(n), np.ones(n)])
+    i = np.repeat(cols, 4, axis=1).ravel()
+    j = np.tile(cols, (1, 4)).ravel()
+    v = (np.repeat(vals, 4, axis=1) * np.tile(vals, (1, 4))).ravel()
+    N = sparse.csr_matrix((v, (i, j)), shape=(size, size))
+    r = np.zeros(size)
+    for k in range(4):
+        r += np.bincount(cols[:, k], weights=vals[:, k] * y, minlength=size)
+    return N, r
+
+def _solve(state):
+    """Ridge-regularised least squares, warm-started from the previous solution."""
+    size = len(state['x'])
+    ridge = np.full(size, RIDGE)
+    ridge[MU] = 0.0
+    A = state['N'] + sparse.diags(ridge)
+    x, _ = cg(A, state['r'], x0=state['x'], rtol=CG_RTOL, maxiter=CG_MAXITER)
+    return x
+
+def _team_ratings(x, team_ids):
+    mu = x[MU]
+    return mu + x[off_index(team_ids)], mu + x[def_index(team_ids)]
+
+def add_ratings(df, state=None):
+    """
+    Opponent-adjusted offensive/defensive efficiency (points per 100 possessions
+    against an average opponent), re-solved after every day from all games up to it.
+    Each row gets both teams' ratings entering that day (NaN before a team's first game).
+    Returns (df, history, state): history has one row per (day, team) with the
+    ratings after that day's games, for as-of lookups.
+    """
+    print("   -> Solving adjusted efficiency ratings...")
+    state = state or new_state()
+    # Never smaller than the carried system: a new batch may only involve low team IDs
+    size = len(state['x'])
+    if len(df):
+        size = max(size, n_vars(int(max(df['team_id'].max(), df['opp_id'].max())) + 1))
+    state = _grow(state, size)
+
+    team_ids = df['team_id'].to_numpy(dtype=np.int64)
+    opp_ids = df['opp_id'].to_numpy(dtype=np.int64)
+    days = df['day'].to_numpy(dtype=np.int64)
+    site = np.where(df['location'].astype(str) == 'Neutral', 0.0, np.where(df['is_home'] == 1, 1.0, -1.0))
+    y = df['off_rating'].to_numpy(dtype=float)
+
+    cols = {c: np.full(len(df), np.nan) for c in ['adj_off_rating', 'adj_def_rating', 'opp_adj_off_rating', 'opp_adj_def_rating']}
+    history = []
+
+    order = np.lexsort((team_ids, days))
+    bounds = np.flatnonzero(np.r_[True, days[order][1:] != days[order][:-1], True])
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        rows = order[a:b]
+        played = state['N'].diagonal()[2::2] > 0  # Rows so far per team (offense diagonal)
+
+        # Entering ratings: the solution from every earlier day
+        for who, prefix in [(team_ids[rows], ''), (opp_ids[rows], 'opp_')]:
+            off, dfn = _team_ratings(state['x'], who)
+            known = played[who]
+            cols[f'{prefix}adj_off_rating'][rows] = np.where(known, off, np.nan)
+            cols[f'{prefix}adj_def_rating'][rows] = np.where(known, dfn, np.nan)
+
+        ok = rows[np.isfinite(y[rows])]
+        N_day, r_day = _day_system(team_ids[ok], opp_ids[ok], site[ok], y[ok], size)
+        state['N'] = state['N'] + N_day
+        state['r'] = state['r'] + r_day
+        state['x'] = _solve(state)
+
+        seen = np.flatnonzero(state['N'].diagonal()[2::2] > 0)
+        off, dfn = _team_ratings(state['x'], seen)
+        history.append(pd.DataFrame({'day': np.int32(days[rows[0]]), 'team_id': seen.astype('int32'), 'adj_off': off, 'adj_def': dfn}))
+
+    for c, values in cols.items():
+        df[c] = values
+    df['diff_adj_em'] = adjusted_margin(
+        {'adj_off': df['adj_off_rating'], 'adj_def': df['adj_def_rating']},
+        {'adj_off': df['opp_adj_off_rating'], 'adj_def': df['opp_adj_def_rating']}
+    )
+
+    history = pd.concat(history, ignore_index=True) if history else pd.DataFrame(columns=['day', 'team_id'] + RATING_COLS)
+    history['date'] = pd.to_datetime(history['day'].astype('int64'), unit='D')
+    return df, history, state
+
+def adjusted_margin(own, opp):
+    """Net adjusted efficiency edge: (adj_off - adj_def) for the team minus the opponent's."""
+    return (own['adj_off'] - own['adj_def']) - (opp['adj_off'] - opp['adj_def'])
+
+def latest(state):
+    """Every rated team's current ratings (after the last solved day), indexed by team_id."""
+    seen = np.flatnonzero(state['N'].diagonal()[2::2] > 0)
+    off, dfn = _team_ratings(state['x'], seen)
+    return pd.DataFrame({'adj_off': off, 'adj_def': dfn}, index=pd.Index(seen.astype('int32'), name='team_id'))
+
+def save_state(state):
+    N = state['N'].tocoo()
+    def write(tmp):
+        with open(tmp, 'wb') as f:
+            np.savez(f, row=N.row, col=N.col, data=N.data, r=state['r'], x=state['x'])
+    store.atomic_write(STATE_FILE, write)
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return None
+    with np.load(STATE_FILE) as z:
+        size = len(z['x'])
+        N = sparse.csr_matrix((z['data'], (z['row'], z['col'])), shape=(size, size))
+        return {'N': N, 'r': z['r'], 'x': z['x']}
+
+def load_store(snapshot=None):
+    """
+    As-of lookups over the daily rating history ("ratings entering day D").
+    With the per-team `snapshot` only the latest ratings are loaded, which answer
+    every lookup after its through_day.
+    """
+    if snapshot is not None:
+        hist = snapshot.assign(day=snapshot['through_day'])
+    else:
+        hist = store.read_table(store.RATINGS, columns=['team_id', 'day'] + RATING_COLS)
+    return team_state.TeamStateStore(hist['team_id'].to_numpy(), hist['day'].to_numpy(),
+                                      hist[RATING_COLS].to_numpy(dtype=float), columns=RATING_COLS)
@@ -0,0 +1,386 @@
+import os
+import shutil
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import hashlib
+import numpy as np
+import manifest
+
+# --- CONFIG ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+LEGACY_CSV = os.path.join(BASE_DIR, "cbb_training_data_processed.csv")
+
+# Tables (one Parquet file per date partition)
+GAMES = "games"        # Raw ingest: two rows per completed game
+FEATURES = "features"  # Output of features.py
+BARTTORVIK = "barttorvik"  # Season game logs, partitioned by season year
+RATINGS = "ratings"    # Adjusted efficiency ratings after each day (features.py)
+BACKTESTS = "backtests"  # Out-of-sample predictions, one partition per backtest run
+
+RAW_COLUMNS = ['date', 'team', 'opponent', 'location', 'team_score', 'opp_score', 'is_home', 'spread', 'ats_win']
+
+# Team dimension: append-only, so a team's int32 ID never changes once assigned
+TEAMS_FILE = os.path.join(DATA_DIR, "teams.parquet")
+FLAG_COLUMNS = ['is_home', 'ats_win']
+
+# Compact feature artifacts, one file per input fingerprint
+FEATURE_CACHE_DIR = os.path.join(DATA_DIR, "cache")
+KEEP_FINGERPRINTS = 3
+KEY_COLUMNS = ['team_id', 'opp_id', 'day']
+
+# Backtest runs kept in the store (oldest are dropped)
+KEEP_BACKTEST_RUNS = 20
+
+# Each team's latest entering state, one row per team (features.py)
+TEAM_SNAPSHOT_FILE = os.path.join(DATA_DIR, "team_snapshot.parquet")
+
+def table_dir(table):
+    return os.path.join(DATA_DIR, table)
+
+def partition_key(value):
+    """Partition keys are ISO dates ('2026-01-07'), so they sort chronologically."""
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+def partition_path(table, key):
+    return os.path.join(table_dir(table), f"{key}.parquet")
+
+def partition_keys(table):
+    """Sorted partition keys, from a directory listing (no data is read)."""
+    try:
+        names = os.listdir(table_dir(table))
+    except FileNotFoundError:
+        return []
+    return sorted(n[:-len('.parquet')] for n in names if n.endswith('.parquet'))
+
+def normalize_games(df):
+    """Typed raw game rows: datetime dates, numeric scores/spreads, int flags."""
+    df = df[[c for c in RAW_COLUMNS if c in df.columns]].copy()
+    df['date'] = pd.to_datetime(df['date']).dt.normalize()
+    for c in ['team_score', 'opp_score', 'spread']:
+        df[c] = pd.to_numeric(df[c], errors='coerce')
+    for c in ['is_home', 'ats_win']:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0).astype('int8')
+    return df
+
+def atomic_write(path, writer):
+    """
+    Write `path` all-or-nothing: `writer(tmp)` writes a temp file (or directory) next
+    to it, which then replaces `path` in one rename. The temp is removed if the
+    writer raises; if it leaves nothing at `tmp`, `path` is untouched.
+    Returns whatever `writer` returns.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        result = writer(tmp)
+        if os.path.exists(tmp):
+            os.replace(tmp, path)
+        return result
+    finally:
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+
+def _write_partition(table, key, df):
+    path = partition_path(table, key)
+    if df is None or len(df) == 0:
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+    atomic_write(path, lambda tmp: df.to_parquet(tmp, index=False))
+    return True
+
+def replace_partition(table, key, df):
+    """
+    Idempotently replace one partition with `df` (atomic rename).
+    An empty frame removes the partition.
+    """
+    if _write_partition(table, key, df):
+        manifest.record(table, {key: df})
+    else:
+        manifest.record(table, {}, removed=[key])
+
+def write_partition_chunks(table, key, chunks):
+    """
+    Stream frames into one partition as Parquet row groups (bounded memory).
+    The schema is fixed by the first chunk; later chunks are coerced to it.
+    Integer columns are stored as float64 so a later chunk with decimals or
+    blanks in them still fits. Returns the number of rows written.
+    """
+    def write(tmp):
+        writer, schema, columns, rows, digest = None, None, None, 0, None
+        try:
+            for chunk in chunks:
+                if writer is None:
+                    columns = list(chunk.columns)
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    schema = pa.schema([_widen(f) for f in schema])
+                    writer = pq.ParquetWriter(tmp, schema)
+                    digest = hashlib.sha256(",".join(map(str, columns)).encode())
+                chunk = _coerce_to_schema(chunk[columns], schema)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                digest.update(pd.util.hash_pandas_object(chunk, index=False).values.tobytes())
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        if rows == 0 and os.path.exists(tmp):
+            os.remove(tmp)  # Nothing to keep
+        return rows, digest, schema
+
+    rows, digest, schema = atomic_write(partition_path(table, key), write)
+    if rows == 0:
+        replace_partition(table, key, None)
+        return 0
+
+    schema_df = schema.empty_table().to_pandas()
+    manifest.record_stats(table, {key: (rows, digest.hexdigest(), manifest.schema_hash(schema_df))})
+    return rows
+
+def _widen(field):
+    """Streaming schema type: untyped (all-null) columns as strings, integers as float64."""
+    if pa.types.is_null(field.type):
+        return field.with_type(pa.string())
+    if pa.types.is_integer(field.type):
+        return field.with_type(pa.float64())
+    return field
+
+def _coerce_to_schema(chunk, schema):
+    chunk = chunk.copy()
+    for field in schema:
+        col = chunk[field.name]
+        if pa.types.is_floating(field.type):
+            chunk[field.name] = pd.to_numeric(col, errors='coerce').astype('float64')
+        elif pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            chunk[field.name] = col.where(col.isna(), col.astype(str))
+    return chunk
+
+def read_partition(table, key, columns=None):
+    path = partition_path(table, key)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns or [])
+    return pd.read_parquet(path, columns=columns)
+
+def read_table(table, columns=None, start=None, end=None):
+    """Read partitions (optionally only those in [start, end]) as one typed frame."""
+    keys = partition_keys(table)
+    if start is not None:
+        keys = [k for k in keys if k >= partition_key(start)]
+    if end is not None:
+        keys = [k for k in keys if k <= partition_key(end)]
+    if not keys:
+        return pd.DataFrame(columns=columns or [])
+
+    tables = [pq.read_table(partition_path(table, k), columns=columns) for k in keys]
+    return pa.concat_tables(tables, promote_options='default').to_pandas()
+
+def upsert_by_date(table, df, replace=False):
+    """
+    Replace every date partition present in `df`; other dates are untouched
+    (or removed, with replace=True). The manifest is updated once at the end.
+    """
+    written = {}
+    for day, part in df.groupby(df['date'].dt.normalize(), sort=True):
+        key = partition_key(day)
+        part = part.reset_index(drop=True)
+        _write_partition(table, key, part)
+        written[key] = part
+
+    removed = []
+    if replace:
+        removed = sorted(set(partition_keys(table)) - set(written))
+        for stale in removed:
+            _write_partition(table, stale, None)
+
+    manifest.record(table, written, removed=removed, replace=replace)
+    return list(written)
+
+def replace_table(table, df):
+    """Rewrite a whole table from `df`, dropping partitions that no longer exist."""
+    return upsert_by_date(table, df, replace=True)
+
+def migrate_legacy_csv(path=LEGACY_CSV):
+    """Seed the games table from the old monolithic CSV (first run only)."""
+    if partition_keys(GAMES) or not os.path.exists(path):
+        return 0
+    print(f"   -> 📦 Migrating {os.path.basename(path)} into {table_dir(GAMES)}...")
+    df = normalize_games(pd.read_csv(path, low_memory=False))
+    df = df.drop_duplicates(subset=['date', 'team'], keep='last')
+    return len(upsert_by_date(GAMES, df))
+
+def load_teams():
+    """The team dimension table (team_id, team), ordered by ID."""
+    if not os.path.exists(TEAMS_FILE):
+        return pd.DataFrame({'team_id': pd.Series(dtype='int32'), 'team': pd.Series(dtype=object)})
+    return pd.read_parquet(TEAMS_FILE)
+
+def team_ids(names, create=False):
+    """
+    Stable int32 IDs for team names (-1 for unknown names).
+    create=True appends unseen names to the dimension table first.
+    """
+    names = pd.Index(pd.Series(names, dtype=object))
+    teams = load_teams()
+    known = pd.Index(teams['team'])
+    if create:
+        new = sorted(set(names.dropna()) - set(known))
+        if new:
+            start = len(teams)
+            added = pd.DataFrame({'team_id': np.arange(start, start + len(new), dtype='int32'), 'team': new})
+            teams = pd.concat([teams, added], ignore_index=True)
+            atomic_write(TEAMS_FILE, lambda tmp: teams.to_parquet(tmp, index=False))
+            known = pd.Index(teams['team'])
+    return known.get_indexer(names).astype('int32')
+
+def day_numbers(dates):
+    """int32 days since 1970-01-01."""
+    days = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]')
+    return days.astype(np.int64).astype('int32')
+
+def add_keys(df):
+    """Integer join keys: team/opponent IDs from the dimension table and day numbers."""
+    df['team_id'] = team_ids(df['team'], create=True)
+    df['opp_id'] = team_ids(df['opponent'], create=True)
+    df['day'] = day_numbers(df['date'])
+    return df
+
+def compact(df):
+    """
+    The in-memory representation every module works on: int32 team IDs and day
+    numbers as keys, team/opponent/location as categoricals (team codes are the
+    team IDs), float32 features and counts, and int8 flags.
+    """
+    if any(c not in df.columns for c in KEY_COLUMNS):
+        df = add_keys(df)
+    names = pd.CategoricalDtype(load_teams()['team'])
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in ['team', 'opponent']:
+            s = pd.Categorical(s, dtype=names)
+        elif col == 'location':
+            s = s.astype('category')
+        elif col in KEY_COLUMNS:
+            s = s.astype('int32')
+        elif col in FLAG_COLUMNS:
+            s = pd.to_numeric(s, errors='coerce').fillna(0).astype('int8')
+        elif s.dtype == 'float64' or s.dtype.kind in 'iu':
+            s = s.astype('float32')  # Counts (scores, turnovers...) are exact in float32
+        out[col] = s
+    return pd.DataFrame(out, index=df.index)
+
+def load_games():
+    """All raw game rows (migrating the legacy CSV on first use)."""
+    migrate_legacy_csv()
+    return read_table(GAMES)
+
+def feature_cache_path(fingerprint):
+    return os.path.join(FEATURE_CACHE_DIR, f"features-{fingerprint[:16]}.parquet")
+
+def write_feature_cache(fingerprint, df):
+    """
+    Save the compacted feature table under its input fingerprint and point the
+    manifest at it; older artifacts beyond KEEP_FINGERPRINTS are deleted.
+    """
+    path = feature_cache_path(fingerprint)
+    atomic_write(path, lambda tmp: df.to_parquet(tmp, index=False))
+    manifest.set_meta('feature_cache', {
+        'fingerprint': fingerprint,
+        'path': os.path.basename(path),
+        'features_hash': manifest.content_hash(FEATURES)
+    })
+    gc_feature_cache(keep=path)
+    return path
+
+def read_feature_cache(fingerprint=None):
+    """
+    The cached compact feature table, or None. Without a fingerprint, the latest
+    artifact is returned only if the features table hasn't changed since.
+    """
+    meta = manifest.get_meta('feature_cache')
+    if not meta:
+        return None
+    if fingerprint is not None and meta['fingerprint'] != fingerprint:
+        return None
+    if fingerprint is None and meta['features_hash'] != manifest.content_hash(FEATURES):
+        return None
+    path = os.path.join(FEATURE_CACHE_DIR, meta['path'])
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+def write_team_snapshot(df):
+    """Save the per-team snapshot, stamped with the features table it was built from."""
+    atomic_write(TEAM_SNAPSHOT_FILE, lambda tmp: df.to_parquet(tmp, index=False))
+    manifest.set_meta('team_snapshot', {'features_hash': manifest.content_hash(FEATURES), 'teams': len(df)})
+
+def read_team_snapshot():
+    """The per-team snapshot, or None if it is missing or older than the features table."""
+    meta = manifest.get_meta('team_snapshot')
+    if not meta or meta['features_hash'] != manifest.content_hash(FEATURES):
+        return None
+    if not os.path.exists(TEAM_SNAPSHOT_FILE):
+        return None
+    return pd.read_parquet(TEAM_SNAPSHOT_FILE)
+
+def gc_feature_cache(keep=None, max_entries=KEEP_FINGERPRINTS):
+    """Drop all but the newest `max_entries` artifacts (never `keep`)."""
+    try:
+        names = [n for n in os.listdir(FEATURE_CACHE_DIR) if n.endswith('.parquet')]
+    except FileNotFoundError:
+        return 0
+    paths = sorted((os.path.join(FEATURE_CACHE_DIR, n) for n in names), key=os.path.getmtime, reverse=True)
+    removed = 0
+    for path in paths[max_entries:]:
+        if path != keep:
+            os.remove(path)
+            removed += 1
+    return removed
+
+def load_processed():
+    """The feature table written by features.py (legacy CSV until the first run), compacted."""
+    cached = read_feature_cache()
+    if cached is not None:
+        return cached
+    if partition_keys(FEATURES):
+        return compact(read_table(FEATURES))
+    if os.path.exists(LEGACY_CSV):
+        df = pd.read_csv(LEGACY_CSV, low_memory=False)
+        df['date'] = pd.to_datetime(df['date'])
+        return compact(df)
+    raise FileNotFoundError("No processed data found. Run main.py / features.py first.")
+
+def write_backtest_run(run_id, df, config):
+    """
+    Save every out-of-sample row of a backtest run as its own partition, with the
+    run's config in the manifest. Run IDs start with a timestamp, so partition
+    order is run order; runs beyond KEEP_BACKTEST_RUNS are dropped.
+    """
+    replace_partition(BACKTESTS, run_id, df)
+    runs = manifest.get_meta('backtest_runs') or {}
+    runs[run_id] = config
+    for old in sorted(runs)[:-KEEP_BACKTEST_RUNS]:
+        replace_partition(BACKTESTS, old, None)
+        runs.pop(old)
+    manifest.set_meta('backtest_runs', runs)
+    return run_id
+
+def backtest_runs():
+    """{run_id: config} for every stored backtest run, oldest first."""
+    runs = manifest.get_meta('backtest_runs') or {}
+    stored = set(partition_keys(BACKTESTS))
+    return {k: runs[k] for k in sorted(runs) if k in stored}
+
+def read_backtest_run(run_id=None, columns=None):
+    """One run's out-of-sample rows (the latest run if `run_id` is None)."""
+    if run_id is None:
+        keys = partition_keys(BACKTESTS)
+        if not keys:
+            raise FileNotFoundError("No backtest runs stored. Run backtest.py first.")
+        run_id = keys[-1]
+    return read_partition(BACKTESTS, run_id, columns=columns)
@@ -0,0 +1,135 @@
+import sys
+import itertools
+import numpy as np
+import pandas as pd
+import store
+
+# --- CONFIG ---
+CONFIDENCE_THRESHOLD = 0.53  # Picks at least this confident are "actionable"
+JUICE = -1.1                 # Units lost on a losing bet at standard -110 (a win pays +1)
+
+# Default sweep grid
+THRESHOLDS = np.round(np.arange(0.50, 0.705, 0.01), 2)
+SPREAD_BUCKETS = [(None, None), (None, -7), (-7, -3), (-3, 0), (0, 3), (3, 7), (7, None)]  # picked spread, [lo, hi)
+SIDES = ['all', 'home', 'away']
+JUICES = [-1.05, -1.1, -1.15]
+MIN_BETS = 50       # Smallest sample the report ranks
+CHUNK_CELLS = 4096  # Strategies scored per vectorized block
+CHUNK_ROWS = 4096   # Predictions per block; memory is bounded by CHUNK_ROWS x CHUNK_CELLS
+
+def units(pick_correct, juice=JUICE):
+    """Profit per bet in units: +1 for a win, `juice` for a loss."""
+    return np.where(np.asarray(pick_correct, dtype=bool), 1.0, juice)
+
+def picks(oos):
+    """
+    The model's pick for every out-of-sample row (home if prob_home > 0.5, else away):
+    confidence, side, the spread on the picked side, and whether it covered.
+    """
+    prob = oos['prob_home'].to_numpy(dtype=float)
+    home = prob > 0.5
+    spread = oos['spread'].to_numpy()
+    ats = oos['ats_win'].to_numpy()
+    return pd.DataFrame({
+        'conf': np.maximum(prob, 1 - prob),
+        'picked_home': home,
+        'picked_spread': np.where(home, spread, -1 * spread),
+        'pick_correct': np.where(home, ats == 1, ats == 0),
+    }, index=oos.index)
+
+def _bucket_mask(spread, lo, hi):
+    mask = np.ones(len(spread), dtype=bool)
+    if lo is not None:
+        mask &= spread >= lo
+    if hi is not None:
+        mask &= spread < hi
+    return mask
+
+def _side_mask(home, side):
+    if side == 'home':
+        return home
+    if side == 'away':
+        return ~home
+    return np.ones(len(home), dtype=bool)
+
+def sweep(oos, thresholds=THRESHOLDS, spread_buckets=SPREAD_BUCKETS, sides=SIDES, juices=JUICES):
+    """
+    Score every threshold x spread bucket x side x juice strategy over out-of-sample
+    rows (e.g. store.read_backtest_run()). Strategies are evaluated together: each
+    block is one boolean selection matrix [rows x strategies] whose cumulative
+    win/loss counts give every equity curve at once. Rows are walked in blocks too,
+    carrying each curve's counts, peak and drawdown from one block to the next.
+
+    Returns one row per strategy: bets, wins, win_rate, units, roi (units per unit
+    staked, a loss stakes |juice|) and max_drawdown (units, peak-to-trough in date order).
+    """
+    oos = oos.sort_values('date', kind='stable')
+    p = picks(oos)
+    conf = p['conf'].to_numpy()
+    home = p['picked_home'].to_numpy()
+    spread = p['picked_spread'].to_numpy(dtype=float)
+    correct = p['pick_correct'].to_numpy()[:, None]
+
+    thresholds = np.asarray(thresholds, dtype=float)
+    juices = np.asarray(juices, dtype=float)
+    by_threshold = conf[:, None] >= thresholds[None, :]
+    by_bucket = np.column_stack([_bucket_mask(spread, lo, hi) for lo, hi in spread_buckets])
+    by_side = np.column_stack([_side_mask(home, s) for s in sides])
+
+    grid = np.array(list(itertools.product(range(len(thresholds)), range(len(spread_buckets)), range(len(sides)))), dtype=np.int64)
+    stats = {k: np.zeros((len(grid), len(juices))) for k in ['units', 'max_drawdown']}
+    bets = np.zeros(len(grid), dtype=np.int64)
+    wins = np.zeros(len(grid), dtype=np.int64)
+
+    for a in range(0, len(grid), CHUNK_CELLS):
+        t, b, s = grid[a:a + CHUNK_CELLS].T
+        won = np.zeros(len(t), dtype=np.int64)
+        lost = np.zeros(len(t), dtype=np.int64)
+        peak = np.zeros((len(juices), len(t)))  # Every curve starts at 0 units
+        drawdown = np.zeros((len(juices), len(t)))
+        for r in range(0, len(conf), CHUNK_ROWS):
+            rows = slice(r, r + CHUNK_ROWS)
+            sel = by_threshold[rows][:, t] & by_bucket[rows][:, b] & by_side[rows][:, s]
+            won_curve = won + np.cumsum(sel & correct[rows], axis=0)
+            lost_curve = lost + np.cumsum(sel & ~correct[rows], axis=0)
+            for j, juice in enumerate(juices):
+                equity = won_curve + juice * lost_curve
+                running_peak = np.maximum(peak[j], np.maximum.accumulate(equity, axis=0))
+                drawdown[j] = np.maximum(drawdown[j], (running_peak - equity).max(axis=0))
+                peak[j] = running_peak[-1]
+            won, lost = won_curve[-1], lost_curve[-1]
+        bets[a:a + CHUNK_CELLS] = won + lost
+        wins[a:a + CHUNK_CELLS] = won
+        stats['units'][a:a + CHUNK_CELLS] = (won[:, None] + juices[None, :] * lost[:, None])
+        stats['max_drawdown'][a:a + CHUNK_CELLS] = drawdown.T
+
+    t, b, s = grid.T
+    lo, hi = zip(*spread_buckets) if spread_buckets else ((), ())
+    out = pd.DataFrame({
+        'threshold': np.repeat(thresholds[t], len(juices)),
+        'spread_lo': np.repeat(np.array(lo, dtype=float)[b], len(juices)),
+        'spread_hi': np.repeat(np.array(hi, dtype=float)[b], len(juices)),
+        'side': np.repeat(np.array(sides)[s], len(juices)),
+        'juice': np.tile(juices, len(grid)),
+        'bets': np.repeat(bets, len(juices)),
+        'wins': np.repeat(wins, len(juices)),
+        'units': stats['units'].ravel(),
+        'max_drawdown': stats['max_drawdown'].ravel(),
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out['win_rate'] = out['wins'] / out['bets']
+        out['roi'] = out['units'] / (out['bets'] * -out['juice'])
+    return out
+
+def report(run_id=None, top=15):
+    """Sweep a stored backtest run (latest by default) and print the best strategies by ROI."""
+    oos = store.read_backtest_run(run_id)
+    results = sweep(oos)
+    ranked = results[results['bets'] >= MIN_BETS].sort_values('roi', ascending=False)
+    print(f"--- 🎛️  STRATEGY SWEEP: {len(results)} strategies over {len(oos)} predictions ---")
+    with pd.option_context('display.width', 140, 'display.max_columns', 20):
+        print(ranked.head(top).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    return results
+
+if __name__ == "__main__":
+    report(sys.argv[1] if len(sys.argv) > 1 else None)
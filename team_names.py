@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher, get_close_matches
+import store
+
+# --- CONFIG ---
+CACHE_FILE = os.path.join(store.DATA_DIR, "team_names.json")
+FUZZY_CUTOFF = 0.6   # Same similarity bar difflib.get_close_matches used
+FUZZY_CANDIDATES = 25  # Teams (by shared trigrams) that get a full similarity score
+NGRAM = 3
+RESOLVER_VERSION = 2  # Bump when matching changes, so names cached under the old rules are dropped
+
+# --- ALIASES ---
+# ESPN display names (and mascot-less forms) -> names in the historical data
+ALIASES = {
+    "St. Thomas-Minnesota Tommies": "St. Thomas MN",
+    "Elon Phoenix": "Elon",
+    "Campbell Fighting Camels": "Campbell",
+    "App State Mountaineers": "Appalachian St.",
+    "UT Martin Skyhawks": "UT Martin",
+    "Denver Pioneers": "Denver",
+    "Omaha Mavericks": "Omaha",
+    "Texas State Bobcats": "Texas St.",
+    "Weber State Wildcats": "Weber St.",
+    "Idaho State Bengals": "Idaho St.",
+    "Louisiana Ragin' Cajuns": "Louisiana",
+    "UL Monroe Warhawks": "UL Monroe",
+    "Idaho Vandals": "Idaho",
+    "Montana Grizzlies": "Montana",
+    "UTEP Miners": "UTEP",
+    "California Baptist Lancers": "California Baptist",
+    "Utah Tech Trailblazers": "Utah Tech",
+    "Drake Bulldogs": "Drake",
+    "Butler Bulldogs": "Butler",
+    "Miami (OH) RedHawks": "Miami OH",
+    "Ball State Cardinals": "Ball St.",
+    "Kent State Golden Flashes": "Kent St.",
+    "Iowa Hawkeyes": "Iowa",
+    "DePaul Blue Demons": "DePaul",
+    "UNLV Rebels": "UNLV",
+    "Fresno State Bulldogs": "Fresno St.",
+    "Nevada Wolf Pack": "Nevada",
+    "Furman Paladins": "Furman",
+    "Marquette Golden Eagles": "Marquette",
+    "Xavier Musketeers": "Xavier",
+    "UAB Blazers": "UAB",
+    "Arkansas Razorbacks": "Arkansas",
+    "Duke Blue Devils": "Duke",
+    "Louisville Cardinals": "Louisville",
+    "North Carolina Tar Heels": "North Carolina",
+    "Kentucky Wildcats": "Kentucky",
+    "Kansas Jayhawks": "Kansas",
+    "Auburn Tigers": "Auburn",
+    "Alabama Crimson Tide": "Alabama",
+    "Tennessee Volunteers": "Tennessee",
+    "UConn Huskies": "Connecticut", 
+    "Ole Miss Rebels": "Mississippi", 
+    "NC State Wolfpack": "North Carolina St.",
+    "Miami Hurricanes": "Miami FL", 
+    "USC Trojans": "USC", 
+    "TCU Horned Frogs": "TCU", 
+    "SMU Mustangs": "SMU",
+    "VCU Rams": "VCU", 
+    "LSU Tigers": "LSU", 
+    "BYU Cougars": "BYU", 
+    "UCF Knights": "UCF",
+    "St. John's Red Storm": "St. John's", 
+    "Saint Mary's Gaels": "Saint Mary's", 
+    "Loyola Chicago Ramblers": "Loyola Chicago",
+    "Michigan State Spartans": "Michigan St.", 
+    "Ohio State Buckeyes": "Ohio St.", 
+    "Iowa State Cyclones": "Iowa St.",
+    "Florida State Seminoles": "Florida St.", 
+    "Kansas State Wildcats": "Kansas St.", 
+    "Oklahoma State Cowboys": "Oklahoma St.",
+    "Oregon State Beavers": "Oregon St.", 
+    "Washington State Cougars": "Washington St.", 
+    "Arizona State Sun Devils": "Arizona St.",
+    "Mississippi State Bulldogs": "Mississippi St.", 
+    "Penn State Nittany Lions": "Penn St.", 
+    "Boise State Broncos": "Boise St.",
+    "San Diego State Aztecs": "San Diego St.", 
+    "Utah State Aggies": "Utah St.", 
+    "Colorado State Rams": "Colorado St.",
+    "Michigan Wolverines": "Michigan", 
+    "West Virginia Mountaineers": "West Virginia", 
+    "Gonzaga Bulldogs": "Gonzaga",
+    "Nebraska Cornhuskers": "Nebraska", 
+    "Seattle U Redhawks": "Seattle", 
+    "Stanford Cardinal": "Stanford", 
+    "Massachusetts Minutemen": "Massachusetts", 
+    "UMass Minutemen": "Massachusetts",
+    "Pittsburgh Panthers": "Pittsburgh", 
+    "Illinois Fighting Illini": "Illinois", 
+    "Wisconsin Badgers": "Wisconsin",
+    "Maryland Terrapins": "Maryland", 
+    "Rutgers Scarlet Knights": "Rutgers", 
+    "Northwestern Wildcats": "Northwestern",
+    "Purdue Boilermakers": "Purdue", 
+    "Indiana Hoosiers": "Indiana", 
+    "Minnesota Golden Gophers": "Minnesota",
+    "Texas Longhorns": "Texas",
+    "Texas A&M Aggies": "Texas A&M",
+    "Texas Tech Red Raiders": "Texas Tech",
+    "Baylor Bears": "Baylor",
+    "Houston Cougars": "Houston",
+    "Virginia Cavaliers": "Virginia",
+    "Virginia Tech Hokies": "Virginia Tech",
+    "Clemson Tigers": "Clemson",
+    "Georgia Tech Yellow Jackets": "Georgia Tech",
+    "Wake Forest Demon Deacons": "Wake Forest",
+    "Syracuse Orange": "Syracuse",
+    "Boston College Eagles": "Boston College",
+    "Notre Dame Fighting Irish": "Notre Dame",
+    "Northeastern Huskies": "Northeastern",
+    # --- Newly Added Schools (Jan 2026) ---
+    "Pennsylvania Quakers": "Penn",
+    "UAlbany Great Danes": "Albany NY",
+    "Tulsa Golden Hurricane": "Tulsa",
+    "Tulane Green Wave": "Tulane",
+    "Hawai'i Rainbow Warriors": "Hawaii",
+    "Wagner Seahawks": "Wagner",
+    "Long Island University Sharks": "Long Island"
+}
+
+def _ngrams(name):
+    padded = f"  {name.lower()} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+def _aliases_hash():
+    return hashlib.sha256(json.dumps(ALIASES, sort_keys=True).encode()).hexdigest()[:16]
+
+class TeamResolver:
+    """
+    Raw team names (ESPN, odds feeds, prediction files) -> names in the team
+    dimension table. Resolution order: persisted cache, exact name, alias table,
+    alias without the mascot, then fuzzy: a trigram inverted index picks the few
+    teams sharing the most trigrams (case-insensitively) and only those get a full
+    similarity score, on the original case like difflib.get_close_matches (which
+    scans every team when no candidate is close enough).
+    Successful resolutions are cached, so each raw name is fuzzy-matched once.
+    """
+
+    def __init__(self, known=None, cache_file=CACHE_FILE):
+        self.known = list(store.load_teams()['team'] if known is None else known)
+        self._known_set = set(self.known)
+        self._index = defaultdict(list)
+        self._sizes = []
+        for i, team in enumerate(self.known):
+            grams = _ngrams(team)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                self._index[gram].append(i)
+        self.cache_file = cache_file
+        self._stamp = {'aliases': _aliases_hash(), 'teams': len(self.known), 'version': RESOLVER_VERSION}
+        self._cache = self._load_cache()
+        self._dirty = False
+
+    def _load_cache(self):
+        # Dropped when aliases or the team list change (a better match may now exist)
+        if not self.cache_file:
+            return {}
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data['names'] if data.get('stamp') == self._stamp else {}
+
+    def save(self):
+        if not self.cache_file or not self._dirty:
+            return
+        def write(tmp):
+            with open(tmp, 'w') as f:
+                json.dump({'stamp': self._stamp, 'names': self._cache}, f, indent=1, sort_keys=True)
+        store.atomic_write(self.cache_file, write)
+        self._dirty = False
+
+    def _fuzzy(self, name):
+        grams = _ngrams(name)
+        shared = Counter(i for gram in grams for i in self._index.get(gram, ()))
+        # Candidates by trigram Dice overlap (size-normalised, so short exact-ish names aren't crowded out)
+        dice = sorted(shared, key=lambda i: -2 * shared[i] / (len(grams) + self._sizes[i]))
+        matcher = SequenceMatcher()
+        matcher.set_seq2(name)
+        scored = []
+        for i in dice[:FUZZY_CANDIDATES]:
+            matcher.set_seq1(self.known[i])
+            score = matcher.ratio()
+            if score >= FUZZY_CUTOFF:
+                scored.append((score, self.known[i]))
+        # Highest similarity wins, ties to the larger name (as get_close_matches ranks)
+        if scored:
+            return max(scored)[1]
+        # Nothing close among the candidates: a similar name can share no trigram, so scan them all
+        close = get_close_matches(name, self.known, n=1, cutoff=FUZZY_CUTOFF)
+        return close[0] if close else None
+
+    def _lookup(self, name):
+        if name in self._known_set:
+            return name
+        if name in ALIASES:
+            return ALIASES[name]
+        parts = name.split()
+        if len(parts) > 1:
+            no_mascot = " ".join(parts[:-1])
+            if no_mascot in ALIASES:
+                return ALIASES[no_mascot]
+        return self._fuzzy(name)
+
+    def resolve(self, name):
+        """The known team name for `name`, or None."""
+        if not isinstance(name, str) or not name:
+            return None
+        hit = self._cache.get(name)
+        if hit is not None:
+            return hit
+        match = self._lookup(name)
+        if match is not None:
+            self._cache[name] = match
+            self._dirty = True
+        return match
+
+    def resolve_many(self, names):
+        """{raw name: known name or None} for a whole slate (each distinct name resolved once)."""
+        out = {name: self.resolve(name) for name in dict.fromkeys(names)}
+        self.save()
+        return out
+
+def resolve_many(names, known=None):
+    """One-shot bulk resolve with the persisted cache (see TeamResolver)."""
+    return TeamResolver(known).resolve_many(names)
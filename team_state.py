@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# --- CONFIG ---
+STATS_COLS = ['eFG', 'TS', 'off_rating', 'poss', 'orb', 'to', 'team_score']
+
+# A team's stats *after* a game, i.e. what it brings into its next one
+SNAPSHOT_COLS = (
+    [f'season_team_{c}' for c in STATS_COLS]
+    + [f'roll3_team_{c}' for c in STATS_COLS]
+    + ['roll5_team_cover_margin']
+)
+MAX_REST_DAYS = 7
+
+class TeamStateStore:
+    """
+    Point-in-time team stats. Rows are kept sorted by (team_id, day) in flat NumPy
+    arrays; "team X entering day D" is a binary search for the last game strictly
+    before D, so one lookup is O(log n) and a bulk lookup is a single searchsorted.
+    """
+
+    def __init__(self, team_ids, days, values, columns=SNAPSHOT_COLS):
+        self.columns = list(columns)
+        team_ids = np.asarray(team_ids, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        order = np.lexsort((days, team_ids))
+        self._ids = team_ids[order]
+        self._days = days[order]
+        self._keys = self._ids * (1 << 32) + self._days
+        self._values = np.asarray(values, dtype=float)[order]
+        self.team_ids = np.unique(self._ids)
+
+    @classmethod
+    def from_features(cls, df):
+        """Build from feature rows (team_id, day and the post-game SNAPSHOT_COLS)."""
+        return cls(df['team_id'].to_numpy(), df['day'].to_numpy(), df[SNAPSHOT_COLS].to_numpy(dtype=float))
+
+    @classmethod
+    def from_snapshot(cls, snap):
+        """Build from the per-team snapshot (team_id, last_game_day and SNAPSHOT_COLS, one row per team)."""
+        return cls(snap['team_id'].to_numpy(), snap['last_game_day'].to_numpy(), snap[SNAPSHOT_COLS].to_numpy(dtype=float))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _locate(self, team_ids, days):
+        team_ids = np.asarray(team_ids, dtype=np.int64)
+        days = np.asarray(days, dtype=np.int64)
+        idx = np.searchsorted(self._keys, team_ids * (1 << 32) + days, side='left') - 1
+        found = (team_ids >= 0) & (idx >= 0)
+        found[found] &= self._ids[idx[found]] == team_ids[found]
+        return np.where(found, idx, -1)
+
+    def asof_bulk(self, team_ids, days):
+        """
+        Entering stats for every (team_id, day) pair, aligned with the inputs.
+        `last_game_day` and the stats are NaN where the team has no earlier game.
+        """
+        idx = self._locate(team_ids, days)
+        found = idx >= 0
+        vals = np.full((len(idx), len(self.columns)), np.nan)
+        vals[found] = self._values[idx[found]]
+        out = pd.DataFrame(vals, columns=self.columns)
+        last = np.full(len(idx), np.nan)
+        last[found] = self._days[idx[found]]
+        out.insert(0, 'last_game_day', last)
+        return out
+
+    def asof(self, team_id, day):
+        """Entering stats for one team on one day as a dict, or None if it has no earlier game."""
+        row = self.asof_bulk([team_id], [day]).iloc[0]
+        if np.isnan(row['last_game_day']):
+            return None
+        return row.to_dict()
+
+def matchup_features(own, opp):
+    """
+    Model inputs built from two teams' entering stats. Works on dicts (one game)
+    and on frames from asof_bulk (many games); features, backtest and predict all
+    go through here so training and serving agree.
+    """
+    return {
+        'diff_eFG': own['season_team_eFG'] - opp['season_team_eFG'],
+        'diff_Rebound': own['season_team_orb'] - opp['season_team_orb'],
+        'diff_TO': own['season_team_to'] - opp['season_team_to'],
+        'momentum_gap': own['roll3_team_eFG'] - own['season_team_eFG'],
+        'roll5_cover_margin': own['roll5_team_cover_margin'],
+    }
+
+def rest_days(game_days, last_game_days):
+    """Days since the previous game, capped at MAX_REST_DAYS (first game counts as fully rested)."""
+    days = pd.Series(np.asarray(game_days, dtype=float) - np.asarray(last_game_days, dtype=float))
+    return days.fillna(MAX_REST_DAYS).clip(upper=MAX_REST_DAYS)